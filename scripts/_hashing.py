@@ -0,0 +1,62 @@
+"""
+Shared SHA256 helpers for the reference file generators and diagnostics.
+
+Used by generate_reference_data.py, generate_reference_files.py,
+generate_reference_validation_data.py, validate_reference_files.py,
+analyze_encoding_differences.py and diagnose_voice_issue.py, which are run
+directly from the scripts directory.
+"""
+
+import hashlib
+import mmap
+import os
+from functools import lru_cache
+from typing import Tuple
+
+# Files at least this large are hashed through mmap instead of a single read()
+MMAP_HASH_THRESHOLD = 1 << 20
+# Read size for the chunked fallback when a file can't be memory-mapped
+HASH_CHUNK_SIZE = 1 << 20
+
+def hash_and_size(file_path) -> Tuple[int, str]:
+    """Return the size and SHA256 hash of a file, read through a single open.
+
+    Files below MMAP_HASH_THRESHOLD are hashed from a single read; larger
+    files are memory-mapped and fed to the hasher in one update() call.
+    The size is the number of bytes hashed, so the two always agree.
+    """
+    sha256_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < MMAP_HASH_THRESHOLD:
+            data = f.read()
+            sha256_hash.update(data)
+            return len(data), sha256_hash.hexdigest()
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                sha256_hash.update(mm)
+                size = len(mm)
+        except (OSError, ValueError):
+            # File can't be mapped; fall back to chunked reads into one reused buffer
+            buf = bytearray(HASH_CHUNK_SIZE)
+            view = memoryview(buf)
+            size = 0
+            n = f.readinto(buf)
+            while n:
+                sha256_hash.update(view[:n])
+                size += n
+                n = f.readinto(buf)
+    return size, sha256_hash.hexdigest()
+
+@lru_cache(maxsize=256)
+def digest(path_str: str, mtime_ns: int, size: int) -> str:
+    """SHA256 of a file, memoized by (path, mtime_ns, size).
+
+    The stat fields are part of the key, so a file that changes on disk is
+    hashed again while an unchanged one is read at most once per run.
+    """
+    return hash_and_size(path_str)[1]
+
+def calculate_sha256(file_path) -> str:
+    """Calculate SHA256 hash of a file (cached while the file is unchanged)."""
+    st = os.stat(file_path)
+    return digest(os.fspath(file_path), st.st_mtime_ns, st.st_size)
@@ -9,16 +9,34 @@ for different audio file types, focusing on mono vs stereo handling.
 import os
 import sys
 import subprocess
-import hashlib
+import filecmp
+import struct
 from pathlib import Path
 
-def calculate_sha256(file_path):
-    """Calculate SHA256 hash of a file."""
-    sha256_hash = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(chunk)
-    return sha256_hash.hexdigest()
+from _hashing import calculate_sha256
+
+# MP3 frame header fields as (name, shift, mask) over the 32-bit big-endian header
+MP3_HEADER_FIELDS = (
+    ("sync", 21, 0x7FF),
+    ("version", 19, 0x3),
+    ("layer", 17, 0x3),
+    ("protection", 16, 0x1),
+    ("bitrate_idx", 12, 0xF),
+    ("samplerate_idx", 10, 0x3),
+    ("padding", 9, 0x1),
+    ("private", 8, 0x1),
+    ("mode", 6, 0x3),
+    ("mode_ext", 4, 0x3),
+    ("copyright", 3, 0x1),
+    ("original", 2, 0x1),
+    ("emphasis", 0, 0x3),
+)
+
+MP3_MODE_NAMES = ["Stereo", "Joint Stereo", "Dual Channel", "Mono"]
+MP3_VERSION_NAMES = ["MPEG-2.5", "Reserved", "MPEG-2", "MPEG-1"]
+MP3_LAYER_NAMES = ["Reserved", "Layer III", "Layer II", "Layer I"]
+MP3_BITRATES = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0]
+MP3_SAMPLERATES_V1 = [44100, 48000, 32000, 0]
 
 def analyze_mp3_header(file_path):
     """Analyze MP3 file header information."""
@@ -30,45 +48,28 @@ def analyze_mp3_header(file_path):
                 return {"error": "File too short"}
             
             # Parse MP3 header
-            header = int.from_bytes(data, 'big')
-            
-            # Extract fields
-            sync = (header >> 21) & 0x7FF
-            version = (header >> 19) & 0x3
-            layer = (header >> 17) & 0x3
-            protection = (header >> 16) & 0x1
-            bitrate_idx = (header >> 12) & 0xF
-            samplerate_idx = (header >> 10) & 0x3
-            padding = (header >> 9) & 0x1
-            private = (header >> 8) & 0x1
-            mode = (header >> 6) & 0x3
-            mode_ext = (header >> 4) & 0x3
-            copyright = (header >> 3) & 0x1
-            original = (header >> 2) & 0x1
-            emphasis = header & 0x3
+            header, = struct.unpack(">I", data)
+            fields = {name: (header >> shift) & mask for name, shift, mask in MP3_HEADER_FIELDS}
             
-            # Decode values
-            mode_names = ["Stereo", "Joint Stereo", "Dual Channel", "Mono"]
-            version_names = ["MPEG-2.5", "Reserved", "MPEG-2", "MPEG-1"]
-            layer_names = ["Reserved", "Layer III", "Layer II", "Layer I"]
-            
-            bitrates = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0]
-            samplerates_v1 = [44100, 48000, 32000, 0]
-            samplerates_v2 = [22050, 24000, 16000, 0]
+            version = fields["version"]
+            layer = fields["layer"]
+            bitrate_idx = fields["bitrate_idx"]
+            samplerate_idx = fields["samplerate_idx"]
+            mode = fields["mode"]
             
             return {
-                "sync": f"0x{sync:03X}",
-                "version": version_names[version] if version < len(version_names) else f"Unknown({version})",
-                "layer": layer_names[layer] if layer < len(layer_names) else f"Unknown({layer})",
-                "protection": "CRC" if protection == 0 else "No CRC",
-                "bitrate": f"{bitrates[bitrate_idx]} kbps" if bitrate_idx < len(bitrates) else f"Unknown({bitrate_idx})",
-                "samplerate": f"{samplerates_v1[samplerate_idx]} Hz" if version == 3 and samplerate_idx < len(samplerates_v1) else f"Unknown({samplerate_idx})",
-                "padding": "Yes" if padding else "No",
-                "mode": mode_names[mode] if mode < len(mode_names) else f"Unknown({mode})",
-                "mode_ext": mode_ext,
-                "copyright": "Yes" if copyright else "No",
-                "original": "Yes" if original else "No",
-                "emphasis": emphasis
+                "sync": f"0x{fields['sync']:03X}",
+                "version": MP3_VERSION_NAMES[version] if version < len(MP3_VERSION_NAMES) else f"Unknown({version})",
+                "layer": MP3_LAYER_NAMES[layer] if layer < len(MP3_LAYER_NAMES) else f"Unknown({layer})",
+                "protection": "CRC" if fields["protection"] == 0 else "No CRC",
+                "bitrate": f"{MP3_BITRATES[bitrate_idx]} kbps" if bitrate_idx < len(MP3_BITRATES) else f"Unknown({bitrate_idx})",
+                "samplerate": f"{MP3_SAMPLERATES_V1[samplerate_idx]} Hz" if version == 3 and samplerate_idx < len(MP3_SAMPLERATES_V1) else f"Unknown({samplerate_idx})",
+                "padding": "Yes" if fields["padding"] else "No",
+                "mode": MP3_MODE_NAMES[mode] if mode < len(MP3_MODE_NAMES) else f"Unknown({mode})",
+                "mode_ext": fields["mode_ext"],
+                "copyright": "Yes" if fields["copyright"] else "No",
+                "original": "Yes" if fields["original"] else "No",
+                "emphasis": fields["emphasis"]
             }
     except Exception as e:
         return {"error": str(e)}
@@ -81,16 +82,14 @@ def run_encoder_with_analysis(encoder_type, input_file, output_file, frame_limit
     
     if encoder_type == "rust":
         cmd = ["cargo", "run", "--", str(input_path), output_file]
-        env = os.environ.copy()
-        if frame_limit:
-            env["RUST_MP3_MAX_FRAMES"] = str(frame_limit)
+        # Only build a child environment when a variable has to be added;
+        # env=None lets subprocess inherit the parent environment as-is
+        env = {**os.environ, "RUST_MP3_MAX_FRAMES": str(frame_limit)} if frame_limit else None
         cwd = workspace_root
     else:  # shine
         shine_binary = workspace_root / "ref" / "shine" / "shineenc.exe"
         cmd = [str(shine_binary), str(input_path), output_file]
-        env = os.environ.copy()
-        if frame_limit:
-            env["SHINE_MAX_FRAMES"] = str(frame_limit)
+        env = {**os.environ, "SHINE_MAX_FRAMES": str(frame_limit)} if frame_limit else None
         cwd = shine_binary.parent
     
     try:
@@ -112,13 +111,14 @@ def run_encoder_with_analysis(encoder_type, input_file, output_file, frame_limit
         
         if result.returncode == 0 and output_path.exists():
             file_size = output_path.stat().st_size
-            file_hash = calculate_sha256(output_path)
             header_info = analyze_mp3_header(output_path)
             
+            # The digest is filled in by the caller once it knows whether the
+            # two outputs are identical
             return {
                 "success": True,
+                "path": str(output_path),
                 "size": file_size,
-                "hash": file_hash,
                 "header": header_info,
                 "stdout": result.stdout[:500],  # Truncate for readability
                 "stderr": result.stderr[:500]
@@ -158,6 +158,18 @@ def main():
         print("   运行Shine编码器...")
         shine_result = run_encoder_with_analysis("shine", input_file, shine_output)
         
+        # Byte-compare the outputs first (size check, then filecmp which stops
+        # at the first differing block); identical files share one digest
+        identical = False
+        if rust_result['success'] and shine_result['success']:
+            identical = (rust_result['size'] == shine_result['size'] and
+                         filecmp.cmp(rust_result['path'], shine_result['path'], shallow=False))
+        
+        if rust_result['success']:
+            rust_result['hash'] = calculate_sha256(rust_result['path'])
+        if shine_result['success']:
+            shine_result['hash'] = rust_result['hash'] if identical else calculate_sha256(shine_result['path'])
+        
         # Compare results
         print(f"\n   📊 结果对比:")
         print(f"   Rust: {'✅' if rust_result['success'] else '❌'}")
@@ -184,7 +196,7 @@ def main():
         
         # Check if outputs match
         if rust_result['success'] and shine_result['success']:
-            if rust_result['hash'] == shine_result['hash']:
+            if identical:
                 print("   🎉 输出完全一致!")
             else:
                 print("   ⚠️  输出不一致!")
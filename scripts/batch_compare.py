@@ -16,9 +16,12 @@
 import os
 import sys
 import subprocess
+import statistics
 import time
 import glob
+import fnmatch
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 import json
 
@@ -43,27 +46,83 @@ def find_executables():
     
     return rust_exe, shine_exe
 
-def run_encoder(exe_path, input_file, output_file, options):
-    """运行编码器"""
+def iter_wav_files(directory, pattern):
+    """按模式逐个产出匹配的文件路径（语义同glob，'**/'前缀表示递归）"""
+    recursive = pattern.startswith('**/')
+    name_pattern = pattern[3:] if recursive else pattern
+    
+    # 含目录部分的复杂模式交给glob处理
+    if os.sep in name_pattern or '/' in name_pattern or '**' in name_pattern:
+        yield from glob.iglob(os.path.join(directory, pattern), recursive=True)
+        return
+    
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return
+    
+    with entries:
+        subdirs = []
+        for entry in entries:
+            # 与glob一致，跳过隐藏文件
+            if entry.name.startswith('.'):
+                continue
+            if recursive and entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif fnmatch.fnmatch(entry.name, name_pattern):
+                yield entry.path
+    
+    for subdir in subdirs:
+        yield from iter_wav_files(subdir, pattern)
+
+STDERR_TAIL_CHARS = 4096  # 失败时只保留stderr末尾部分
+LAUNCH_OVERHEAD_RUNS = 20  # 测量进程启动开销的采样次数
+
+def measure_launch_overhead(exe_path, runs=LAUNCH_OVERHEAD_RUNS):
+    """
+    测量编码器进程的启动开销（纳秒）
+    
+    不带参数启动编码器（只打印用法即退出），取多次结果的中位数。
+    使用同一个可执行文件作为基线，才能反映其自身的加载和初始化成本。
+    """
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter_ns()
+        try:
+            subprocess.run([exe_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10)
+        except (OSError, subprocess.SubprocessError):
+            return 0
+        samples.append(time.perf_counter_ns() - t0)
+    return int(statistics.median(samples))
+
+def run_encoder(exe_path, input_file, output_file, options, launch_overhead_ns=0):
+    """
+    运行编码器（stdout从不使用，直接丢弃；stderr仅在失败时保留）
+    
+    返回的raw_time为实测耗时（秒），time为扣除launch_overhead_ns后近似的纯编码耗时。
+    扣除结果可能为负（编码耗时小于启动开销的测量误差），不做截断，如实报告。
+    """
     cmd = [exe_path] + options + [input_file, output_file]
     
     try:
-        start_time = time.time()
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-        end_time = time.time()
+        t0 = time.perf_counter_ns()
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                text=True, errors='replace', timeout=300)
+        elapsed_ns = time.perf_counter_ns() - t0
         
+        success = result.returncode == 0
         return {
-            'success': result.returncode == 0,
-            'time': end_time - start_time,
-            'stdout': result.stdout,
-            'stderr': result.stderr,
+            'success': success,
+            'time': (elapsed_ns - launch_overhead_ns) / 1e9,
+            'raw_time': elapsed_ns / 1e9,
+            'stderr': None if success else result.stderr[-STDERR_TAIL_CHARS:],
             'returncode': result.returncode
         }
     except subprocess.TimeoutExpired:
         return {
             'success': False,
             'time': 300,
-            'stdout': '',
+            'raw_time': 300,
             'stderr': '编码超时',
             'returncode': -1
         }
@@ -71,38 +130,39 @@ def run_encoder(exe_path, input_file, output_file, options):
         return {
             'success': False,
             'time': 0,
-            'stdout': '',
+            'raw_time': 0,
             'stderr': str(e),
             'returncode': -1
         }
 
 def get_file_info(file_path):
-    """获取文件信息"""
-    if not os.path.exists(file_path):
+    """获取文件信息，文件不存在时返回None"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
         return None
     
-    stat = os.stat(file_path)
     return {
         'size': stat.st_size,
         'size_mb': stat.st_size / (1024 * 1024)
     }
 
-def process_file(input_file, rust_exe, shine_exe, options, output_dir, verbose=False):
-    """处理单个文件"""
-    input_path = Path(input_file)
-    base_name = input_path.stem
+def process_file(input_file, rust_exe, shine_exe, options, output_dir, launch_overhead_ns=(0, 0),
+                 base_name=None):
+    """
+    处理单个文件，launch_overhead_ns为(Rust, Shine)的进程启动开销
+    
+    base_name为输出文件名前缀，默认取输入文件名（不含扩展名）。
+    """
+    if base_name is None:
+        base_name = Path(input_file).stem
     
     rust_output = output_dir / f"{base_name}_rust.mp3"
     shine_output = output_dir / f"{base_name}_shine.mp3"
     
-    if verbose:
-        print(f"\n处理文件: {input_file}")
-        print(f"  Rust输出: {rust_output}")
-        print(f"  Shine输出: {shine_output}")
-    
-    # 运行编码器
-    rust_result = run_encoder(rust_exe, input_file, str(rust_output), options)
-    shine_result = run_encoder(shine_exe, input_file, str(shine_output), options)
+    # 两个编码器依次运行，计时互不干扰
+    rust_result = run_encoder(rust_exe, input_file, str(rust_output), options, launch_overhead_ns[0])
+    shine_result = run_encoder(shine_exe, input_file, str(shine_output), options, launch_overhead_ns[1])
     
     # 获取文件信息
     input_info = get_file_info(input_file)
@@ -115,6 +175,7 @@ def process_file(input_file, rust_exe, shine_exe, options, output_dir, verbose=F
         'rust': {
             'success': rust_result['success'],
             'time': rust_result['time'],
+            'raw_time': rust_result['raw_time'],
             'output_file': str(rust_output),
             'output_size': rust_info['size'] if rust_info else 0,
             'error': rust_result['stderr'] if not rust_result['success'] else None
@@ -122,6 +183,7 @@ def process_file(input_file, rust_exe, shine_exe, options, output_dir, verbose=F
         'shine': {
             'success': shine_result['success'],
             'time': shine_result['time'],
+            'raw_time': shine_result['raw_time'],
             'output_file': str(shine_output),
             'output_size': shine_info['size'] if shine_info else 0,
             'error': shine_result['stderr'] if not shine_result['success'] else None
@@ -134,27 +196,78 @@ def process_file(input_file, rust_exe, shine_exe, options, output_dir, verbose=F
         result['size_diff'] = size_diff
         result['size_diff_percent'] = (size_diff / shine_info['size']) * 100
     
-    if verbose:
-        if rust_result['success']:
-            print(f"  ✅ Rust: {rust_result['time']:.2f}s, {rust_info['size']:,} bytes")
-        else:
-            print(f"  ❌ Rust: {rust_result['stderr']}")
-        
-        if shine_result['success']:
-            print(f"  ✅ Shine: {shine_result['time']:.2f}s, {shine_info['size']:,} bytes")
-        else:
-            print(f"  ❌ Shine: {shine_result['stderr']}")
-        
-        if 'size_diff' in result:
-            print(f"  📊 大小差异: {result['size_diff']:,} bytes ({result['size_diff_percent']:.2f}%)")
-    
     return result
 
+def format_time(encoder_result):
+    """格式化编码耗时，扣除了启动开销时同时显示实测耗时"""
+    text = f"{encoder_result['time']:.2f}s"
+    if encoder_result['raw_time'] != encoder_result['time']:
+        text += f" (实测 {encoder_result['raw_time']:.2f}s)"
+    return text
+
+def print_file_result(result):
+    """打印单个文件的详细结果"""
+    rust = result['rust']
+    shine = result['shine']
+    
+    print(f"\n处理文件: {result['input_file']}")
+    print(f"  Rust输出: {rust['output_file']}")
+    print(f"  Shine输出: {shine['output_file']}")
+    
+    if rust['success']:
+        print(f"  ✅ Rust: {format_time(rust)}, {rust['output_size']:,} bytes")
+    else:
+        print(f"  ❌ Rust: {rust['error']}")
+    
+    if shine['success']:
+        print(f"  ✅ Shine: {format_time(shine)}, {shine['output_size']:,} bytes")
+    else:
+        print(f"  ❌ Shine: {shine['error']}")
+    
+    if 'size_diff' in result:
+        print(f"  📊 大小差异: {result['size_diff']:,} bytes ({result['size_diff_percent']:.2f}%)")
+
 def print_summary(results):
     """打印汇总统计"""
     total_files = len(results)
-    rust_success = sum(1 for r in results if r['rust']['success'])
-    shine_success = sum(1 for r in results if r['shine']['success'])
+    rust_success = 0
+    shine_success = 0
+    
+    # 单次遍历累计所有统计量
+    successful_count = 0
+    total_rust_time = 0.0
+    total_shine_time = 0.0
+    total_rust_raw_time = 0.0
+    total_shine_raw_time = 0.0
+    size_diff_count = 0
+    size_diff_total = 0.0
+    max_diff = float('-inf')
+    min_diff = float('inf')
+    identical_count = 0
+    
+    for r in results:
+        rust_ok = r['rust']['success']
+        shine_ok = r['shine']['success']
+        rust_success += rust_ok
+        shine_success += shine_ok
+        
+        if not (rust_ok and shine_ok):
+            continue
+        
+        successful_count += 1
+        total_rust_time += r['rust']['time']
+        total_shine_time += r['shine']['time']
+        total_rust_raw_time += r['rust']['raw_time']
+        total_shine_raw_time += r['shine']['raw_time']
+        
+        diff = r.get('size_diff_percent')
+        if diff is not None:
+            size_diff_count += 1
+            size_diff_total += diff
+            max_diff = max(max_diff, diff)
+            min_diff = min(min_diff, diff)
+            if diff == 0:
+                identical_count += 1
     
     print(f"\n=== 批量编码汇总 ===")
     print(f"总文件数: {total_files}")
@@ -162,17 +275,16 @@ def print_summary(results):
     print(f"Shine成功: {shine_success}/{total_files} ({shine_success/total_files*100:.1f}%)")
     
     # 成功的文件统计
-    successful_results = [r for r in results if r['rust']['success'] and r['shine']['success']]
-    
-    if successful_results:
-        print(f"\n=== 性能对比 (成功编码的{len(successful_results)}个文件) ===")
-        
-        total_rust_time = sum(r['rust']['time'] for r in successful_results)
-        total_shine_time = sum(r['shine']['time'] for r in successful_results)
+    if successful_count:
+        print(f"\n=== 性能对比 (成功编码的{successful_count}个文件) ===")
         
         print(f"总编码时间:")
-        print(f"  Rust:  {total_rust_time:.2f}秒")
-        print(f"  Shine: {total_shine_time:.2f}秒")
+        if (total_rust_time, total_shine_time) != (total_rust_raw_time, total_shine_raw_time):
+            print(f"  Rust:  {total_rust_time:.2f}秒 (实测 {total_rust_raw_time:.2f}秒)")
+            print(f"  Shine: {total_shine_time:.2f}秒 (实测 {total_shine_raw_time:.2f}秒)")
+        else:
+            print(f"  Rust:  {total_rust_time:.2f}秒")
+            print(f"  Shine: {total_shine_time:.2f}秒")
         
         if total_rust_time > 0 and total_shine_time > 0:
             if total_rust_time < total_shine_time:
@@ -183,19 +295,15 @@ def print_summary(results):
                 print(f"  Rust比Shine慢 {slowdown:.1f}x")
         
         # 文件大小统计
-        size_diffs = [r['size_diff_percent'] for r in successful_results if 'size_diff_percent' in r]
-        if size_diffs:
-            avg_diff = sum(size_diffs) / len(size_diffs)
-            max_diff = max(size_diffs)
-            min_diff = min(size_diffs)
+        if size_diff_count:
+            avg_diff = size_diff_total / size_diff_count
             
             print(f"\n文件大小差异统计:")
             print(f"  平均差异: {avg_diff:.2f}%")
             print(f"  最大差异: {max_diff:.2f}%")
             print(f"  最小差异: {min_diff:.2f}%")
             
-            identical_count = sum(1 for d in size_diffs if d == 0)
-            print(f"  完全相同: {identical_count}/{len(size_diffs)} ({identical_count/len(size_diffs)*100:.1f}%)")
+            print(f"  完全相同: {identical_count}/{size_diff_count} ({identical_count/size_diff_count*100:.1f}%)")
 
 def main():
     parser = argparse.ArgumentParser(description="批量MP3编码器对比工具")
@@ -208,6 +316,8 @@ def main():
     parser.add_argument('-v', '--verbose', action='store_true', help='详细模式')
     parser.add_argument('--output-dir', help='输出目录，默认与输入文件同目录')
     parser.add_argument('--save-report', help='保存详细报告到JSON文件')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='并行处理的文件数，默认CPU核心数（每个文件的两个编码器依次运行，各占一个核心）')
     
     args = parser.parse_args()
     
@@ -222,16 +332,6 @@ def main():
         print("错误: 找不到Shine编码器")
         sys.exit(1)
     
-    # 查找WAV文件
-    search_pattern = os.path.join(args.directory, args.pattern)
-    wav_files = glob.glob(search_pattern, recursive=True)
-    
-    if not wav_files:
-        print(f"在 '{args.directory}' 中找不到匹配 '{args.pattern}' 的文件")
-        sys.exit(1)
-    
-    print(f"找到 {len(wav_files)} 个WAV文件")
-    
     # 构建编码选项
     options = []
     if args.bitrate:
@@ -246,17 +346,54 @@ def main():
     if options:
         print(f"编码选项: {' '.join(options)}")
     
-    # 处理文件
-    results = []
+    # 启动开销在空闲时逐次测量，只有编码器同样逐个运行时才能从编码耗时中扣除
+    if args.workers == 1:
+        launch_overhead_ns = (measure_launch_overhead(rust_exe), measure_launch_overhead(shine_exe))
+        print(f"进程启动开销: Rust {launch_overhead_ns[0] / 1e6:.1f}ms, "
+              f"Shine {launch_overhead_ns[1] / 1e6:.1f}ms (已从编码时间中扣除)")
+    else:
+        launch_overhead_ns = (0, 0)
+        print(f"并行处理 {args.workers} 个文件，编码时间包含进程启动开销（使用 --workers 1 可扣除）")
+    
+    # 查找WAV文件并即时提交到进程池（边遍历边编码，结果按发现顺序保存）
     output_dir = Path(args.output_dir) if args.output_dir else None
     
-    for i, wav_file in enumerate(wav_files, 1):
-        if not args.verbose:
-            print(f"处理 {i}/{len(wav_files)}: {os.path.basename(wav_file)}")
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {}
+        used_names = set()  # 已分配的 (输出目录, 输出文件名前缀)
+        for index, wav_file in enumerate(iter_wav_files(args.directory, args.pattern)):
+            file_output_dir = output_dir if output_dir else Path(wav_file).parent
+            
+            # 不同子目录中的同名文件会写入同一个输出文件，并行时互相覆盖：重命名后者的输出
+            stem = Path(wav_file).stem
+            base_name, suffix = stem, 1
+            while (file_output_dir, base_name) in used_names:
+                suffix += 1
+                base_name = f"{stem}_{suffix}"
+            used_names.add((file_output_dir, base_name))
+            if base_name != stem:
+                print(f"注意: {wav_file} 的输出文件名已被占用，重命名为 {base_name}_rust.mp3 / {base_name}_shine.mp3")
+            
+            future = executor.submit(process_file, wav_file, rust_exe, shine_exe, options, file_output_dir,
+                                     launch_overhead_ns, base_name)
+            futures[future] = index
+        
+        if not futures:
+            print(f"在 '{args.directory}' 中找不到匹配 '{args.pattern}' 的文件")
+            sys.exit(1)
+        
+        print(f"找到 {len(futures)} 个WAV文件")
+        results = [None] * len(futures)
         
-        file_output_dir = output_dir if output_dir else Path(wav_file).parent
-        result = process_file(wav_file, rust_exe, shine_exe, options, file_output_dir, args.verbose)
-        results.append(result)
+        for completed, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            result = future.result()
+            results[index] = result
+            
+            if args.verbose:
+                print_file_result(result)
+            else:
+                print(f"完成 {completed}/{len(futures)}: {os.path.basename(result['input_file'])}")
     
     # 打印汇总
     print_summary(results)
@@ -13,104 +13,243 @@ import os
 import sys
 import subprocess
 import re
+import argparse
+import shutil
+import tempfile
+import math
+import statistics
+from array import array
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 
-def parse_realtime_ratio(output_text):
+# Encoder output is matched as raw bytes so it never needs decoding
+_REALTIME_RE = re.compile(rb'\(([0-9]+\.?[0-9]*)x realtime\)')
+
+def parse_realtime_ratio(output):
     """
-    Parse realtime ratio from encoder output
+    Parse realtime ratio from encoder output (bytes)
     
     支持两种格式：
     - 新格式：(123.4x realtime) - 高精度计时
     - 旧格式：(infx realtime) - 当编码时间 < 1秒时
     """
     # Look for pattern like "(123.4x realtime)"
-    match = re.search(r'\(([0-9]+\.?[0-9]*)x realtime\)', output_text)
+    match = _REALTIME_RE.search(output)
     if match:
         return float(match.group(1))
     
     # Look for "infx realtime" (infinite speed - encoding time < 1 second)
-    if 'infx realtime' in output_text:
+    if b'infx realtime' in output:
         return float('inf')
     
     return None
 
-def benchmark_shine_c(audio_file, bitrate, output_file):
-    """Benchmark Shine C encoder - 读取命令行输出的实际倍率"""
-    shine_exe = Path("ref/shine/shineenc.exe")
-    if not shine_exe.exists():
+# Prebuilt encoder binaries; cargo is never invoked per measurement
+RUST_EXE_CANDIDATES = (Path("target/release/shine-rs-cli.exe"), Path("target/release/shine-rs-cli"))
+SHINE_EXE_CANDIDATES = (Path("ref/shine/shineenc.exe"), Path("ref/shine/shineenc"))
+
+def find_binary(candidates):
+    """Return the first existing path among candidates, or None"""
+    return next((path for path in candidates if path.exists()), None)
+
+def ensure_rust_binary():
+    """
+    Locate the release Rust binary, building it once with cargo if missing.
+    
+    Returns None if the binary is still unavailable, so the caller can stop
+    before starting any measurement.
+    """
+    rust_exe = find_binary(RUST_EXE_CANDIDATES)
+    if rust_exe is not None:
+        return rust_exe
+    
+    print("   未找到 Rust 二进制文件，正在运行: cargo build --release")
+    try:
+        result = subprocess.run(["cargo", "build", "--release"], stdout=subprocess.DEVNULL)
+    except OSError as e:
+        print(f"   ❌ 无法运行 cargo: {e}")
         return None
     
+    if result.returncode != 0:
+        print(f"   ❌ cargo build --release 失败 (exit code {result.returncode})")
+        return None
+    return find_binary(RUST_EXE_CANDIDATES)
+
+def _stderr_text(stderr):
+    """Decode captured stderr for an error message, only needed on failure"""
+    return stderr.decode('utf-8', 'replace').strip()
+
+ENCODER_TIMEOUT = 60
+
+def shine_c_command(shine_exe, audio_file, bitrate, output_file):
+    """Build the Shine C command line"""
+    # 不使用 -q 参数，这样可以读取输出信息
+    # 使用绝对路径避免路径问题
+    abs_audio_file = os.path.abspath(audio_file)
+    abs_output_file = output_file if output_file == os.devnull else os.path.abspath(output_file)
+    return [str(shine_exe), "-b", str(bitrate), abs_audio_file, abs_output_file]
+
+def rust_command(rust_exe, audio_file, bitrate, output_file):
+    """Build the Rust encoder command line"""
+    # 不使用 -q 参数，这样可以读取输出信息
+    return [str(rust_exe), "-b", str(bitrate), audio_file, output_file]
+
+def _spawn(cmd):
+    """Start an encoder without waiting for it; returns (proc, error)"""
     try:
-        # 不使用 -q 参数，这样可以读取输出信息
-        # 使用绝对路径避免路径问题
-        abs_audio_file = os.path.abspath(audio_file)
-        abs_output_file = os.path.abspath(output_file)
-        cmd = [str(shine_exe), "-b", str(bitrate), abs_audio_file, abs_output_file]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-        
-        if result.returncode == 0:
-            # 从Shine输出解析实际倍率
-            shine_reported_ratio = parse_realtime_ratio(result.stdout)
-            
-            # Clean up output file
-            if os.path.exists(abs_output_file):
-                os.remove(abs_output_file)
-            
-            return shine_reported_ratio
-        else:
-            print(f"❌ Shine C failed (exit code {result.returncode})")
-            if result.stderr:
-                print(f"   Error: {result.stderr.strip()}")
+        return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE), None
+    except OSError as e:
+        return None, str(e)
+
+def _collect(proc, name, bitrate):
+    """
+    Wait for a spawned encoder and read its reported ratio - 读取命令行输出的实际倍率
+    
+    Returns (ratio, error): ratio is None on failure and error describes why.
+    Nothing is printed here so that concurrent jobs don't interleave output.
+    """
+    try:
+        stdout, stderr = proc.communicate(timeout=ENCODER_TIMEOUT)
     except subprocess.TimeoutExpired:
-        print(f"⚠️  Shine C timeout for {bitrate}kbps")
-    except Exception as e:
-        print(f"❌ Shine C error: {e}")
+        proc.kill()
+        proc.communicate()
+        return None, f"⚠️  {name} timeout for {bitrate}kbps"
     
-    return None
+    if proc.returncode == 0:
+        return parse_realtime_ratio(stdout), None
+    
+    error = f"❌ {name} failed (exit code {proc.returncode})"
+    if stderr:
+        error += f"\n   Error: {_stderr_text(stderr)}"
+    return None, error
 
-def benchmark_rust(audio_file, bitrate, output_file):
-    """Benchmark Rust encoder - 读取命令行输出的实际倍率"""
-    rust_exe = Path("target/release/shine-rs-cli.exe")
-    if not rust_exe.exists():
-        print(f"❌ Rust binary not found: {rust_exe}")
-        print("   Please run: cargo build --release")
-        return None
+def run_benchmark_job(audio_file, bitrate, rust_exe, shine_exe, repeat=1, keep_output=False):
+    """
+    Benchmark both encoders for one (file, bitrate) pair.
     
-    try:
-        # 不使用 -q 参数，这样可以读取输出信息
-        cmd = [str(rust_exe), "-b", str(bitrate), audio_file, output_file]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-        
-        if result.returncode == 0:
-            # 从Rust输出解析实际倍率
-            rust_reported_ratio = parse_realtime_ratio(result.stdout)
-            
-            # Clean up output file
-            if os.path.exists(output_file):
-                os.remove(output_file)
+    Each repetition launches Rust and Shine C together and then waits on both,
+    so their runs overlap. The ratio is timed inside each encoder process, so
+    the overlap does not affect it. The best of `repeat` runs is kept, since
+    the first invocation pays for cold caches; an encoder stops being run
+    after its first failure.
+    
+    Encoded MP3 data goes to os.devnull, so nothing is written to disk or has
+    to be deleted afterwards. With keep_output the MP3s are written to
+    the working directory instead, one file per encoder, input and bitrate.
+    """
+    if keep_output:
+        stem = Path(audio_file).stem
+        rust_output = f"bench_rust_{stem}_{bitrate}k.mp3"
+        shine_output = f"bench_shine_{stem}_{bitrate}k.mp3"
+    else:
+        rust_output = shine_output = os.devnull
+    
+    commands = {"Rust": rust_command(rust_exe, audio_file, bitrate, rust_output)}
+    if shine_exe is not None:
+        commands["Shine C"] = shine_c_command(shine_exe, audio_file, bitrate, shine_output)
+    
+    # One preallocated slot per repetition; a failed encoder's buffer is dropped
+    ratios = {name: array('d', [0.0]) * repeat for name in commands}
+    errors = dict.fromkeys(("Rust", "Shine C"))
+    for i in range(repeat):
+        # Launch every encoder before waiting on any of them
+        running = {name: _spawn(cmd) for name, cmd in commands.items()}
+        for name, (proc, error) in running.items():
+            ratio = None
+            if proc is not None:
+                ratio, error = _collect(proc, name, bitrate)
+            elif error:
+                error = f"❌ {name} error: {error}"
             
-            return rust_reported_ratio
+            if ratio is None:
+                errors[name] = error
+                del commands[name], ratios[name]
+            else:
+                ratios[name][i] = ratio
+        if not commands:
+            break
+    
+    best = {name: max(values) for name, values in ratios.items()}
+    return best.get("Rust"), errors["Rust"], best.get("Shine C"), errors["Shine C"]
+
+def stage_inputs(filenames, staging_dir):
+    """
+    Copy the input WAVs into staging_dir and read each copy once.
+    
+    Every measured run then reads an input that is already in the page cache,
+    instead of the first run of each file paying for a cold disk read.
+    Returns a mapping from the original path to the staged copy.
+    """
+    staged = {}
+    for index, filename in enumerate(filenames):
+        # Per-input subdirectory keeps same-named inputs apart and the stem intact
+        target = Path(staging_dir) / str(index) / Path(filename).name
+        target.parent.mkdir()
+        shutil.copy2(filename, target)
+        target.read_bytes()
+        staged[filename] = str(target)
+    return staged
+
+def _finite_mean(values):
+    """
+    Mean of the finite ratios, or None if there are none.
+    
+    An 'inf' ratio means the encoder finished too fast to time, so it is
+    left out of averages rather than swamping them.
+    """
+    finite = [v for v in values if not math.isinf(v)]
+    return statistics.fmean(finite) if finite else None
+
+def print_summary(results, bitrates):
+    """Print per-bitrate and overall average ratios for the successful pairs"""
+    print("\n" + "=" * 60)
+    print("📈 Performance Summary")
+    print("=" * 60)
+    
+    if not results:
+        return
+    
+    # Group (rust, shine) ratio pairs by bitrate in one pass over the results
+    pairs_by_bitrate = defaultdict(list)
+    for r in results:
+        pairs_by_bitrate[r['bitrate']].append((r['rust_ratio'], r['shine_ratio']))
+    
+    for bitrate in bitrates:
+        ok_pairs = pairs_by_bitrate.get(bitrate)
+        if not ok_pairs:
+            continue
+        rust_ratios, shine_ratios = zip(*ok_pairs)
+        rust_avg = _finite_mean(rust_ratios)
+        shine_avg = _finite_mean(shine_ratios)
+        
+        if rust_avg is None:
+            print(f"🎯 {bitrate}kbps: Rust: unmeasurable (too fast)")
+        elif shine_avg is not None:
+            speedup = rust_avg / shine_avg
+            print(f"🎯 {bitrate}kbps: Rust {rust_avg:.1f}x | Shine {shine_avg:.1f}x | 🚀{speedup:.1f}x faster")
         else:
-            print(f"❌ Rust encoder failed (exit code {result.returncode})")
-            if result.stderr:
-                print(f"   Error: {result.stderr.strip()}")
-    except subprocess.TimeoutExpired:
-        print(f"⚠️  Rust timeout for {bitrate}kbps")
-    except Exception as e:
-        print(f"❌ Rust error: {e}")
+            print(f"🎯 {bitrate}kbps: Rust {rust_avg:.1f}x | Shine: unmeasurable (too fast)")
     
-    return None
+    # Overall average
+    rust_ratios, shine_ratios = zip(*(pair for pairs in pairs_by_bitrate.values() for pair in pairs))
+    overall_rust = _finite_mean(rust_ratios)
+    overall_shine = _finite_mean(shine_ratios)
+    
+    if overall_rust is not None and overall_shine is not None:
+        overall_speedup = overall_rust / overall_shine
+        print(f"\n🏆 Overall: Rust {overall_rust:.1f}x | Shine {overall_shine:.1f}x | 🚀{overall_speedup:.1f}x faster")
+    elif overall_rust is not None:
+        print(f"\n🏆 Overall: Rust {overall_rust:.1f}x | Shine: mostly unmeasurable (too fast)")
 
-def run_benchmark():
+def run_benchmark(jobs=1, repeat=1, keep_output=False, warm=True):
     """Run the complete benchmark"""
     print("🚀 Shine-RS vs Shine C Performance Benchmark")
     print("=" * 60)
     print("📋 使用编译后的二进制文件进行性能测试")
-    print("   - Rust: target/release/shine-rs-cli.exe")
-    print("   - Shine C: ref/shine/shineenc.exe")
-    print("   - 如果缺少二进制文件，请先运行编译命令")
+    print("   - Rust: target/release/shine-rs-cli[.exe]（缺失时自动运行一次 cargo build --release）")
+    print("   - Shine C: ref/shine/shineenc[.exe]")
     print()
     print("📋 编码器内置计时分析:")
     print("   - 读取编码器命令行输出中的实时倍率")
@@ -118,20 +257,19 @@ def run_benchmark():
     print("   - 获得更准确的编码算法性能数据")
     print()
     
-    # Check if required binaries exist
-    rust_exe = Path("target/release/shine-rs-cli.exe")
-    shine_exe = Path("ref/shine/shineenc.exe")
-    
+    # Resolve the binaries once; fail fast before any measurement starts
     print("🔍 检查必要的二进制文件...")
-    if not rust_exe.exists():
-        print(f"❌ Rust 二进制文件不存在: {rust_exe}")
+    rust_exe = ensure_rust_binary()
+    if rust_exe is None:
+        print(f"❌ Rust 二进制文件不存在: {RUST_EXE_CANDIDATES[0].parent}/shine-rs-cli[.exe]")
         print("   请运行: cargo build --release")
         return
     else:
         print(f"✅ Rust 二进制文件: {rust_exe}")
     
-    if not shine_exe.exists():
-        print(f"⚠️  Shine C 二进制文件不存在: {shine_exe}")
+    shine_exe = find_binary(SHINE_EXE_CANDIDATES)
+    if shine_exe is None:
+        print(f"⚠️  Shine C 二进制文件不存在: {SHINE_EXE_CANDIDATES[0]}")
         print("   请运行: cd ref/shine && .\\build.ps1")
         print("   将只测试 Rust 编码器性能")
     else:
@@ -163,92 +301,114 @@ def run_benchmark():
     
     print(f"\n🧪 Running benchmark tests...")
     
+    print(f"   并行任务数: {jobs}，每项重复: {repeat}次（取最佳），输入预热: {'是' if warm else '否'}")
+    
     results = []
     
-    for filename, description in available_files:
-        print(f"\n🎵 测试: {description}")
-        print(f"   文件: {filename}")
+    # 每个 (文件, 比特率) 组合是一个独立任务；编码工作在子进程中完成，线程池即可并行。
+    # executor.map 按提交顺序返回结果，因此输出顺序与串行执行时一致。
+    job_args = [(filename, bitrate) for filename, _ in available_files for bitrate in bitrates]
+    
+    with tempfile.TemporaryDirectory(prefix="shine_bench_") as staging_dir:
+        # 默认把输入文件复制到临时目录并预读一次，使每次测量都命中页缓存
+        if warm:
+            inputs = stage_inputs([filename for filename, _ in available_files], staging_dir)
+        else:
+            inputs = {filename: filename for filename, _ in available_files}
         
-        for bitrate in bitrates:
-            print(f"   📊 {bitrate}kbps: ", end="", flush=True)
-            
-            # Test Rust encoder
-            rust_output = f"temp_rust_{bitrate}.mp3"
-            rust_ratio = benchmark_rust(filename, bitrate, rust_output)
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            job_results = executor.map(
+                partial(run_benchmark_job, rust_exe=rust_exe, shine_exe=shine_exe,
+                        repeat=repeat, keep_output=keep_output),
+                [inputs[filename] for filename, _ in job_args],
+                [bitrate for _, bitrate in job_args],
+            )
             
-            # Test Shine C encoder
-            shine_output = f"temp_shine_{bitrate}.mp3"
-            shine_ratio = benchmark_shine_c(filename, bitrate, shine_output)
-            
-            if rust_ratio is not None and shine_ratio is not None:
-                if shine_ratio == float('inf'):
-                    print(f"Rust: {rust_ratio:.1f}x | Shine: inf | 🚀 Rust measurable")
-                else:
-                    speedup = rust_ratio / shine_ratio
-                    print(f"Rust: {rust_ratio:.1f}x | Shine: {shine_ratio:.1f}x | 🚀{speedup:.1f}x faster")
+            for filename, description in available_files:
+                print(f"\n🎵 测试: {description}")
+                print(f"   文件: {filename}")
                 
-                results.append({
-                    'file': filename,
-                    'description': description,
-                    'bitrate': bitrate,
-                    'rust_ratio': rust_ratio,
-                    'shine_ratio': shine_ratio
-                })
-            elif rust_ratio is not None:
-                print(f"Rust: {rust_ratio:.1f}x | Shine: failed")
-            elif shine_ratio is not None:
-                print(f"Rust: failed | Shine: {shine_ratio:.1f}x")
-            else:
-                print("Both failed")
-    
-    # Print summary
-    print("\n" + "=" * 60)
-    print("📈 Performance Summary")
-    print("=" * 60)
-    
-    if results:
-        for bitrate in bitrates:
-            bitrate_results = [r for r in results if r['bitrate'] == bitrate]
-            if bitrate_results:
-                rust_avg = sum(r['rust_ratio'] for r in bitrate_results if r['rust_ratio'] != float('inf')) / len(bitrate_results)
-                shine_finite = [r['shine_ratio'] for r in bitrate_results if r['shine_ratio'] != float('inf')]
-                
-                if shine_finite:
-                    shine_avg = sum(shine_finite) / len(shine_finite)
-                    speedup = rust_avg / shine_avg
-                    print(f"🎯 {bitrate}kbps: Rust {rust_avg:.1f}x | Shine {shine_avg:.1f}x | 🚀{speedup:.1f}x faster")
-                else:
-                    print(f"🎯 {bitrate}kbps: Rust {rust_avg:.1f}x | Shine: unmeasurable (too fast)")
+                for bitrate in bitrates:
+                    print(f"   📊 {bitrate}kbps: ", end="", flush=True)
+                    
+                    rust_ratio, rust_error, shine_ratio, shine_error = next(job_results)
+                    for error in (rust_error, shine_error):
+                        if error:
+                            print(error)
+                    
+                    if rust_ratio is not None and shine_ratio is not None:
+                        if math.isinf(shine_ratio):
+                            print(f"Rust: {rust_ratio:.1f}x | Shine: inf | 🚀 Rust measurable")
+                        else:
+                            speedup = rust_ratio / shine_ratio
+                            print(f"Rust: {rust_ratio:.1f}x | Shine: {shine_ratio:.1f}x | 🚀{speedup:.1f}x faster")
+                        
+                        results.append({
+                            'file': filename,
+                            'description': description,
+                            'bitrate': bitrate,
+                            'rust_ratio': rust_ratio,
+                            'shine_ratio': shine_ratio
+                        })
+                    elif rust_ratio is not None:
+                        print(f"Rust: {rust_ratio:.1f}x | Shine: failed")
+                    elif shine_ratio is not None:
+                        print(f"Rust: failed | Shine: {shine_ratio:.1f}x")
+                    else:
+                        print("Both failed")
         
-        # Overall average
-        all_rust = [r['rust_ratio'] for r in results if r['rust_ratio'] != float('inf')]
-        all_shine = [r['shine_ratio'] for r in results if r['shine_ratio'] != float('inf')]
         
-        if all_rust and all_shine:
-            overall_rust = sum(all_rust) / len(all_rust)
-            overall_shine = sum(all_shine) / len(all_shine)
-            overall_speedup = overall_rust / overall_shine
-            
-            print(f"\n🏆 Overall: Rust {overall_rust:.1f}x | Shine {overall_shine:.1f}x | 🚀{overall_speedup:.1f}x faster")
-        elif all_rust:
-            overall_rust = sum(all_rust) / len(all_rust)
-            print(f"\n🏆 Overall: Rust {overall_rust:.1f}x | Shine: mostly unmeasurable (too fast)")
+    print_summary(results, bitrates)
     
-    # Clean up temporary MP3 files
+    # Clean up temp_*.mp3 files left behind by earlier or interrupted runs
     print(f"\n🧹 清理临时文件...")
-    temp_files = [f for f in os.listdir('.') if f.startswith('temp_') and f.endswith('.mp3')]
-    for temp_file in temp_files:
+    for temp_file in Path('.').glob('temp_*.mp3'):
         try:
-            os.remove(temp_file)
+            temp_file.unlink(missing_ok=True)
             print(f"   删除: {temp_file}")
         except OSError:
             pass
     
     print("✅ 性能测试完成!")
 
+def positive_int(value):
+    """argparse type: an integer >= 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Shine-RS vs Shine C performance benchmark")
+    parser.add_argument(
+        "--jobs",
+        type=positive_int,
+        default=max(1, (os.cpu_count() or 2) // 2),
+        help="Number of (file, bitrate) benchmarks to run concurrently (default: half the CPU cores)"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=positive_int,
+        default=1,
+        help="Invocations per encoder and configuration; the best reported ratio is kept (default: 1)"
+    )
+    parser.add_argument(
+        "--keep-output",
+        action="store_true",
+        help="Write the encoded MP3s to bench_*.mp3 files and keep them (default: discard to os.devnull)"
+    )
+    parser.add_argument(
+        "--no-warm",
+        dest="warm",
+        action="store_false",
+        help="Read inputs in place instead of staging pre-read copies in the temp directory (TMPDIR)"
+    )
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        run_benchmark()
+        run_benchmark(jobs=args.jobs, repeat=args.repeat, keep_output=args.keep_output, warm=args.warm)
     except KeyboardInterrupt:
         print("\n⚠️  Benchmark interrupted by user")
         sys.exit(1)
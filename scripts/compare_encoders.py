@@ -18,41 +18,53 @@ import os
 import sys
 import subprocess
 import argparse
+import bisect
+import shutil
+import signal
+import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
+def _find_executable(directories, names, path_name):
+    """
+    在候选目录中查找编码器，返回绝对路径；都找不到时在PATH中查找path_name
+    
+    每个目录只做一次 os.scandir，DirEntry 自带 readdir 得到的文件类型，
+    无需逐个候选路径 stat。同一目录内按 names 的顺序优先。
+    """
+    for directory in directories:
+        try:
+            with os.scandir(directory) as entries:
+                found = {entry.name: entry.path for entry in entries
+                         if entry.name in names and entry.is_file()}
+        except OSError:
+            continue
+        
+        for name in names:
+            if name in found:
+                # 解析为绝对路径：不含目录的文件名在POSIX上执行时会去PATH中查找
+                return os.path.abspath(found[name])
+    return shutil.which(path_name)
+
+@lru_cache(maxsize=1)
 def find_executables():
     """查找Rust和Shine编码器的可执行文件路径"""
     
-    # Rust编码器路径
-    rust_exe = None
-    possible_rust_paths = [
-        "target/release/shine-rs-cli.exe",
-        "target/debug/shine-rs-cli.exe", 
-        "shine-rs-cli.exe",
-        "target/release/shine-rs-cli",
-        "target/debug/shine-rs-cli",
+    # Rust编码器路径，优先使用项目内的构建产物
+    rust_exe = _find_executable(
+        ["target/release", "target/debug", "."],
+        ("shine-rs-cli.exe", "shine-rs-cli"),
         "shine-rs-cli"
-    ]
-    
-    for path in possible_rust_paths:
-        if os.path.exists(path):
-            rust_exe = path
-            break
+    )
     
     # Shine编码器路径
-    shine_exe = None
-    possible_shine_paths = [
-        "ref/shine/shineenc.exe",
-        "ref/shine/build/shineenc.exe",
-        "ref/shine/shineenc",
-        "ref/shine/build/shineenc"
-    ]
-    
-    for path in possible_shine_paths:
-        if os.path.exists(path):
-            shine_exe = path
-            break
+    shine_exe = _find_executable(
+        ["ref/shine", "ref/shine/build"],
+        ("shineenc.exe", "shineenc"),
+        "shineenc"
+    )
     
     return rust_exe, shine_exe
 
@@ -74,30 +86,67 @@ def build_command_args(base_args, encoder_type):
     
     return cmd_args
 
-def run_encoder(exe_path, input_file, output_file, options, encoder_name):
-    """运行编码器并返回结果"""
-    
-    if not exe_path:
-        print(f"错误: 找不到{encoder_name}编码器可执行文件")
-        return False, None, None
-    
+ENCODER_TIMEOUT = 300  # 5分钟超时
+
+def kill_process_tree(proc):
+    """强制结束进程及其派生的子进程，并等待其退出"""
+    try:
+        if os.name == 'nt':
+            subprocess.run(
+                ["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        pass
+    # taskkill 不可用或进程组已不存在时，至少结束直接子进程
+    if proc.poll() is None:
+        proc.kill()
+    proc.wait()
+
+def _read_spooled(f):
+    """读回临时文件中的进程输出"""
+    f.seek(0)
+    return f.read().decode('utf-8', 'replace')
+
+def execute_encoder(cmd, quiet=False):
+    """运行编码器进程并计时，不打印任何内容，可在线程池中并行调用"""
+    # 输出由子进程直接写入临时文件，父进程无需边运行边读取管道；
+    # 安静模式下 stdout 直接丢弃
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        start_time = time.perf_counter()
+        # 独立会话（POSIX），超时时可连同其子进程一起结束
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.DEVNULL if quiet else out,
+            stderr=err,
+            start_new_session=True
+        )
+        try:
+            returncode = proc.wait(timeout=ENCODER_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            kill_process_tree(proc)
+            raise
+        duration = time.perf_counter() - start_time
+        
+        result = subprocess.CompletedProcess(cmd, returncode, _read_spooled(out), _read_spooled(err))
+    return result, duration
+
+def start_encoder(executor, exe_path, input_file, output_file, options):
+    """在线程池中启动编码器，返回 (命令, future)"""
     # 构建完整命令
     cmd = [exe_path] + options + [input_file, output_file]
-    
+    return cmd, executor.submit(execute_encoder, cmd, quiet='-q' in options)
+
+def report_encoder(encoder_name, cmd, future):
+    """等待编码器完成，输出结果并返回 (是否成功, stdout, stderr)"""
     print(f"\n=== 运行 {encoder_name} 编码器 ===")
     print(f"命令: {' '.join(cmd)}")
     
     try:
-        start_time = time.time()
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=300  # 5分钟超时
-        )
-        end_time = time.time()
-        
-        duration = end_time - start_time
+        result, duration = future.result()
         
         if result.returncode == 0:
             print(f"✅ {encoder_name} 编码成功 (耗时: {duration:.2f}秒)")
@@ -120,17 +169,38 @@ def run_encoder(exe_path, input_file, output_file, options, encoder_name):
         return False, None, str(e)
 
 def get_file_info(file_path):
-    """获取文件信息"""
-    if not os.path.exists(file_path):
+    """获取文件信息，文件不存在时返回None"""
+    # 一次 stat 同时完成存在性检查和大小读取
+    try:
+        stat = os.stat(file_path)
+    except OSError:
         return None
     
-    stat = os.stat(file_path)
     return {
         'size': stat.st_size,
         'size_mb': stat.st_size / (1024 * 1024),
         'exists': True
     }
 
+# 文件大小差异百分比的分级阈值及对应提示（差异为0时单独处理）
+SIZE_DIFF_THRESHOLDS = (1.0, 5.0)
+SIZE_DIFF_MESSAGES = (
+    "✅ 文件大小非常接近",
+    "⚠️  文件大小略有差异",
+    "❌ 文件大小差异较大",
+)
+
+def print_output_info(label, output_file, info, input_size):
+    """输出单个编码结果的大小和压缩比"""
+    print(f"\n{label}输出: {output_file}")
+    if info:
+        size = info['size']
+        print(f"  大小: {size:,} 字节 ({info['size_mb']:.2f} MB)")
+        if input_size is not None:
+            print(f"  压缩比: {input_size / size:.1f}:1")
+    else:
+        print("  ❌ 文件不存在")
+
 def compare_results(rust_output, shine_output, input_file):
     """对比编码结果"""
     print(f"\n=== 编码结果对比 ===")
@@ -140,42 +210,25 @@ def compare_results(rust_output, shine_output, input_file):
     rust_info = get_file_info(rust_output)
     shine_info = get_file_info(shine_output)
     
+    input_size = input_info['size'] if input_info else None
     if input_info:
         print(f"输入文件: {input_file}")
-        print(f"  大小: {input_info['size']:,} 字节 ({input_info['size_mb']:.2f} MB)")
+        print(f"  大小: {input_size:,} 字节 ({input_info['size_mb']:.2f} MB)")
     
-    print(f"\nRust版本输出: {rust_output}")
-    if rust_info:
-        print(f"  大小: {rust_info['size']:,} 字节 ({rust_info['size_mb']:.2f} MB)")
-        if input_info:
-            compression_ratio = input_info['size'] / rust_info['size']
-            print(f"  压缩比: {compression_ratio:.1f}:1")
-    else:
-        print("  ❌ 文件不存在")
-    
-    print(f"\nShine版本输出: {shine_output}")
-    if shine_info:
-        print(f"  大小: {shine_info['size']:,} 字节 ({shine_info['size_mb']:.2f} MB)")
-        if input_info:
-            compression_ratio = input_info['size'] / shine_info['size']
-            print(f"  压缩比: {compression_ratio:.1f}:1")
-    else:
-        print("  ❌ 文件不存在")
+    print_output_info("Rust版本", rust_output, rust_info, input_size)
+    print_output_info("Shine版本", shine_output, shine_info, input_size)
     
     # 大小对比
     if rust_info and shine_info:
-        size_diff = abs(rust_info['size'] - shine_info['size'])
-        size_diff_percent = (size_diff / shine_info['size']) * 100
+        shine_size = shine_info['size']
+        size_diff = abs(rust_info['size'] - shine_size)
+        size_diff_percent = (size_diff / shine_size) * 100
         print(f"\n文件大小差异: {size_diff:,} 字节 ({size_diff_percent:.2f}%)")
         
         if size_diff == 0:
             print("✅ 文件大小完全相同")
-        elif size_diff_percent < 1.0:
-            print("✅ 文件大小非常接近")
-        elif size_diff_percent < 5.0:
-            print("⚠️  文件大小略有差异")
         else:
-            print("❌ 文件大小差异较大")
+            print(SIZE_DIFF_MESSAGES[bisect.bisect_right(SIZE_DIFF_THRESHOLDS, size_diff_percent)])
 
 def main():
     parser = argparse.ArgumentParser(
@@ -252,19 +305,20 @@ def main():
     if options:
         print(f"编码选项: {' '.join(options)}")
     
-    # 运行编码器
+    # 运行编码器：两个编码器互不依赖，并行运行，结果按固定顺序输出
     rust_success = True
     shine_success = True
     
-    if not args.shine_only:
-        rust_success, rust_stdout, rust_stderr = run_encoder(
-            rust_exe, args.input_file, str(rust_output), options, "Rust"
-        )
-    
-    if not args.rust_only:
-        shine_success, shine_stdout, shine_stderr = run_encoder(
-            shine_exe, args.input_file, str(shine_output), options, "Shine"
-        )
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        if not args.shine_only:
+            rust_job = start_encoder(executor, rust_exe, args.input_file, str(rust_output), options)
+        if not args.rust_only:
+            shine_job = start_encoder(executor, shine_exe, args.input_file, str(shine_output), options)
+        
+        if not args.shine_only:
+            rust_success, rust_stdout, rust_stderr = report_encoder("Rust", *rust_job)
+        if not args.rust_only:
+            shine_success, shine_stdout, shine_stderr = report_encoder("Shine", *shine_job)
     
     # 对比结果
     if not args.rust_only and not args.shine_only:
@@ -6,6 +6,35 @@ Create a simple test WAV file for debugging MP3 encoder
 import struct
 import math
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to struct.pack
+    np = None
+
+def _sine_pcm(num_samples, sample_rate, channels):
+    """Build the interleaved little-endian 16-bit PCM data for a 440Hz sine wave"""
+    if np is not None:
+        t = np.arange(num_samples, dtype=np.float64) / sample_rate
+        # Truncate toward zero like int()
+        samples = np.trunc(16000 * np.sin(2 * np.pi * 440 * t)).astype('<i2')
+        if channels != 1:
+            # Stereo: same signal on both channels. The broadcast view repeats
+            # each sample along the channel axis without copying; tobytes()
+            # then emits the interleaved frames in one pass.
+            samples = np.broadcast_to(samples[:, None], (num_samples, channels))
+        return samples.tobytes()
+    
+    samples = []
+    for i in range(num_samples):
+        # Generate a 440Hz sine wave
+        t = i / sample_rate
+        sample_value = int(16000 * math.sin(2 * math.pi * 440 * t))
+        # Stereo: same signal on both channels
+        samples.extend([sample_value] * channels)
+    
+    # One pack call for the whole buffer instead of one per sample
+    return struct.pack(f'<{len(samples)}h', *samples)
+
 def create_test_wav(filename, duration=0.1, sample_rate=44100, channels=2):
     """Create a simple test WAV file with sine wave"""
     
@@ -13,53 +42,27 @@ def create_test_wav(filename, duration=0.1, sample_rate=44100, channels=2):
     num_samples = int(duration * sample_rate)
     
     # Generate sine wave data
-    samples = []
-    for i in range(num_samples):
-        # Generate a 440Hz sine wave
-        t = i / sample_rate
-        sample_value = int(16000 * math.sin(2 * math.pi * 440 * t))
-        
-        if channels == 1:
-            samples.append(sample_value)
-        else:
-            # Stereo: same signal on both channels
-            samples.append(sample_value)  # Left channel
-            samples.append(sample_value)  # Right channel
+    pcm = _sine_pcm(num_samples, sample_rate, channels)
+    
+    # WAV file header: RIFF, fmt and data chunk headers packed in one call.
+    # The data size is known up front, so the RIFF size needs no backpatching.
+    data_size = len(pcm)  # 16-bit samples
+    header = struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16,               # fmt chunk size
+        1,                         # PCM format
+        channels,                  # Number of channels
+        sample_rate,               # Sample rate
+        sample_rate * channels * 2,  # Byte rate
+        channels * 2,              # Block align
+        16,                        # Bits per sample
+        b'data', data_size,
+    )
     
-    # WAV file header
     with open(filename, 'wb') as f:
-        # RIFF header
-        f.write(b'RIFF')
-        
-        # File size (will be updated later)
-        file_size_pos = f.tell()
-        f.write(struct.pack('<I', 0))  # Placeholder
-        
-        f.write(b'WAVE')
-        
-        # fmt chunk
-        f.write(b'fmt ')
-        f.write(struct.pack('<I', 16))  # fmt chunk size
-        f.write(struct.pack('<H', 1))   # PCM format
-        f.write(struct.pack('<H', channels))  # Number of channels
-        f.write(struct.pack('<I', sample_rate))  # Sample rate
-        f.write(struct.pack('<I', sample_rate * channels * 2))  # Byte rate
-        f.write(struct.pack('<H', channels * 2))  # Block align
-        f.write(struct.pack('<H', 16))  # Bits per sample
-        
-        # data chunk
-        f.write(b'data')
-        data_size = len(samples) * 2  # 16-bit samples
-        f.write(struct.pack('<I', data_size))
-        
-        # Write sample data
-        for sample in samples:
-            f.write(struct.pack('<h', sample))
-        
-        # Update file size in header
-        file_size = f.tell() - 8
-        f.seek(file_size_pos)
-        f.write(struct.pack('<I', file_size))
+        f.write(header)
+        f.write(pcm)
 
 if __name__ == '__main__':
     # Create a simple test WAV file
@@ -10,17 +10,38 @@
 
 使用方法:
     python scripts/generate_reference_data.py
+    python scripts/generate_reference_data.py --force  # 忽略缓存，全部重新生成
 """
 
 import os
 import sys
+import argparse
 import json
 import re
 import hashlib
+import io
+import struct
 import subprocess
 import wave
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timezone
+from functools import lru_cache, partial
+from itertools import islice
+from operator import attrgetter, lt
 from pathlib import Path
+from typing import NamedTuple
+
+from _hashing import hash_and_size
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder/decoder
+    orjson = None
+
+# 解码JSON调试记录：优先使用 orjson（C实现，直接接受字节串）
+_json_loads = orjson.loads if orjson is not None else json.loads
 
 # 测试配置列表
 TEST_CONFIGS = [
@@ -54,48 +75,105 @@ TEST_CONFIGS = [
     }
 ]
 
-def calculate_sha256(file_path):
-    """计算文件的SHA256哈希值"""
-    sha256_hash = hashlib.sha256()
+def calculate_sha256(file_path, out=None):
+    """计算文件的SHA256哈希值（大写十六进制），出错信息写入 out（默认 sys.stdout）"""
     try:
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(chunk)
-        return sha256_hash.hexdigest().upper()
+        return hash_and_size(file_path)[1].upper()
     except Exception as e:
-        print(f"计算哈希值时出错 {file_path}: {e}")
+        print(f"计算哈希值时出错 {file_path}: {e}", file=out)
         return ""
 
-def read_wav_metadata(wav_path):
-    """读取WAV文件元数据"""
+class WavMeta(NamedTuple):
+    """WAV文件元数据（不可变，可以安全地被缓存共享）"""
+    channels: int
+    sample_rate: int
+    frames: int
+    sample_width: int
+
+# 标准44字节PCM WAV头：RIFF头、16字节fmt块、data块头
+WAV_PCM_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+WAVE_FORMAT_PCM = 1
+
+def _read_pcm_wav_header(wav_path):
+    """按标准44字节PCM头直接解析WAV元数据，头部不是该布局时返回 None"""
+    with open(wav_path, 'rb') as f:
+        header = f.read(WAV_PCM_HEADER.size)
+    if len(header) < WAV_PCM_HEADER.size:
+        return None
+    
+    (riff_id, _, wave_id, fmt_id, fmt_size, audio_format, channels, sample_rate,
+     _, _, bits_per_sample, data_id, data_size) = WAV_PCM_HEADER.unpack(header)
+    sample_width = (bits_per_sample + 7) // 8
+    if (riff_id != b'RIFF' or wave_id != b'WAVE' or fmt_id != b'fmt ' or fmt_size != 16
+            or audio_format != WAVE_FORMAT_PCM or data_id != b'data' or not channels * sample_width):
+        return None
+    
+    return WavMeta(
+        channels=channels,
+        sample_rate=sample_rate,
+        frames=data_size // (channels * sample_width),
+        sample_width=sample_width
+    )
+
+@lru_cache(maxsize=None)
+def _read_wav_metadata_cached(wav_path):
+    """读取WAV文件元数据，同一音频文件被多个测试配置使用时只读取一次（读取失败时抛出异常，不缓存）"""
+    # 常见的44字节PCM头直接解析；其他布局（额外的块、扩展fmt等）交给 wave 模块
+    metadata = _read_pcm_wav_header(wav_path)
+    if metadata is not None:
+        return metadata
+    
+    with wave.open(wav_path, 'rb') as wav_file:
+        return WavMeta(
+            channels=wav_file.getnchannels(),
+            sample_rate=wav_file.getframerate(),
+            frames=wav_file.getnframes(),
+            sample_width=wav_file.getsampwidth()
+        )
+
+def read_wav_metadata(wav_path, out=None):
+    """读取WAV文件元数据，出错时把错误信息写入 out（默认 sys.stdout）并返回 None"""
     try:
-        with wave.open(wav_path, 'rb') as wav_file:
-            channels = wav_file.getnchannels()
-            sample_rate = wav_file.getframerate()
-            frames = wav_file.getnframes()
-            sample_width = wav_file.getsampwidth()
-            
-            return {
-                "channels": channels,
-                "sample_rate": sample_rate,
-                "frames": frames,
-                "sample_width": sample_width
-            }
+        return _read_wav_metadata_cached(wav_path)
     except Exception as e:
-        print(f"读取WAV文件时出错 {wav_path}: {e}")
+        print(f"读取WAV文件时出错 {wav_path}: {e}", file=out)
         return None
 
-def run_shine_with_json_debug(audio_file, output_file, bitrate, max_frames):
-    """使用JSON调试模式运行Shine编码器"""
-    shine_exe = "ref/shine/shineenc.exe"
+SHINE_EXE = "ref/shine/shineenc.exe"
+OUTPUT_TAIL_LINES = 50  # 编码失败时显示的输出行数
+OUTPUT_BLOCK_SIZE = 1 << 16  # 每次从编码器输出管道读取的字节数
+
+def _read_line_blocks(stream, block_size=OUTPUT_BLOCK_SIZE):
+    """按块读取二进制流，每块只包含完整的行（未结束的行留到下一块），流结束时输出剩余部分"""
+    pending = b''
+    # 无缓冲的管道（原始流）read 一次系统调用即返回已有数据；带缓冲的流用 read1 达到同样效果
+    read = getattr(stream, 'read1', stream.read)
+    while block := read(block_size):
+        block = pending + block
+        cut = block.rfind(b'\n') + 1
+        if cut:
+            pending = block[cut:]
+            yield block[:cut]
+        else:
+            pending = block
+    if pending:
+        yield pending
+
+def run_shine_with_json_debug(audio_file, output_file, bitrate, max_frames, out=None):
+    """
+    使用JSON调试模式运行Shine编码器，返回 (解析出的帧数据, MP3路径, MP3的SHA256, MP3大小)
+    
+    运行信息写入 out（默认 sys.stdout）。
+    """
+    shine_exe = SHINE_EXE
     
     if not os.path.exists(shine_exe):
-        print(f"错误：找不到Shine编码器 {shine_exe}")
-        return None, None
+        print(f"错误：找不到Shine编码器 {shine_exe}", file=out)
+        return None, None, None, None
     
     if not os.path.exists(audio_file):
-        print(f"错误：找不到音频文件 {audio_file}")
-        return None, None
+        print(f"错误：找不到音频文件 {audio_file}", file=out)
+        return None, None, None, None
     
     # 转换为绝对路径
     audio_file_abs = os.path.abspath(audio_file)
@@ -107,281 +185,503 @@ def run_shine_with_json_debug(audio_file, output_file, bitrate, max_frames):
     
     # 运行Shine编码器
     cmd = [shine_exe, "-b", str(bitrate), audio_file_abs, output_file]
+    mp3_file = f"ref/shine/{output_file}"
     
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, 
-                              cwd="ref/shine", env=env, encoding='utf-8', errors='replace')
+        # stderr 合并到 stdout，边运行边按块解析，不在内存中保留完整输出；
+        # 只保留最近若干块（每块至少一整行），用于编码失败时显示末尾的行。
+        # 调试行都是ASCII，直接以字节解析，不对整个输出做UTF-8解码
+        # bufsize=0：管道数据直接读入解析块，不经过 BufferedReader 的中间缓冲
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0,
+                                cwd="ref/shine", env=env)
+        output_tail = deque(maxlen=OUTPUT_TAIL_LINES)
         
-        if result.returncode == 0:
-            print(f"✓ Shine编码成功: {output_file}")
-            # 合并stdout和stderr获取调试输出
-            debug_output = result.stdout + result.stderr
-            return debug_output, f"ref/shine/{output_file}"
+        def stream_blocks():
+            for block in _read_line_blocks(proc.stdout):
+                output_tail.append(block)
+                yield block
+        
+        with proc:
+            frames = parse_shine_debug_output(stream_blocks(), out)
+        
+        if proc.returncode == 0:
+            print(f"✓ Shine编码成功: {output_file}", file=out)
+            # 编码器退出后立即哈希：此时MP3已完整写入，且仍在页缓存中
+            file_size, file_hash = hash_and_size(mp3_file)
+            return frames, mp3_file, file_hash.upper(), file_size
         else:
-            print(f"✗ Shine编码失败:")
-            print(f"  命令: {' '.join(cmd)}")
-            print(f"  返回码: {result.returncode}")
-            print(f"  Stdout: {result.stdout}")
-            print(f"  Stderr: {result.stderr}")
-            return None, None
+            print(f"✗ Shine编码失败:", file=out)
+            print(f"  命令: {' '.join(cmd)}", file=out)
+            print(f"  返回码: {proc.returncode}", file=out)
+            tail_lines = b''.join(output_tail).splitlines(keepends=True)[-OUTPUT_TAIL_LINES:]
+            tail_text = b''.join(tail_lines).decode('utf-8', errors='replace')
+            print(f"  输出（末尾{OUTPUT_TAIL_LINES}行）: {tail_text}", file=out)
+            return None, None, None, None
     except Exception as e:
-        print(f"运行Shine编码器时出错: {e}")
-        return None, None
+        print(f"运行Shine编码器时出错: {e}", file=out)
+        return None, None, None, None
 
-def parse_json_debug_output(debug_output):
-    """解析Shine的JSON调试输出"""
-    frames = {}
+# 帧记录使用带 __slots__ 的数据类（Python 3.10+），字段顺序即输出JSON中的键顺序
+_record = dataclass(slots=True) if sys.version_info >= (3, 10) else dataclass
+
+@_record
+class MdctCoefficients:
+    """JSON调试输出中的MDCT系数（k=17, 16, 15）"""
+    coefficients_before_aliasing: list = field(default_factory=lambda: [0, 0, 0])
+    coefficients_after_aliasing: list = field(default_factory=lambda: [0, 0, 0])
+    l3_sb_sample: list = field(default_factory=lambda: [0])
+
+@_record
+class TextMdctCoefficients:
+    """文本调试输出中的MDCT系数（k=17, 16, 15）"""
+    coefficients: list = field(default_factory=lambda: [0, 0, 0])
+    l3_sb_sample: list = field(default_factory=lambda: [0])
+
+@_record
+class Quantization:
+    xrmax: int = 0
+    max_bits: int = 0
+    part2_3_length: int = 0
+    quantizer_step_size: int = 0
+    global_gain: int = 0
+
+@_record
+class Bitstream:
+    padding: int = 0
+    bits_per_frame: int = 0
+    written: int = 0
+    slot_lag: float = 0.0
+
+@_record
+class Frame:
+    frame_number: int
+    mdct_coefficients: object
+    quantization: Quantization = field(default_factory=Quantization)
+    bitstream: Bitstream = field(default_factory=Bitstream)
+
+def _new_json_frame(frame_num):
+    """JSON调试输出的空帧记录"""
+    return Frame(frame_num, MdctCoefficients())
+
+def _new_text_frame(frame_num):
+    """文本调试输出的空帧记录"""
+    return Frame(frame_num, TextMdctCoefficients())
+
+def _record_as_dict(obj):
+    """stdlib json 的 default 回调：把帧记录转换为字典（按字段顺序，嵌套记录由编码器递归处理）"""
+    if hasattr(obj, '__dataclass_fields__'):
+        return {f.name: getattr(obj, f.name) for f in fields(obj)}
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _sorted_frame_list(frames):
+    """
+    转换为按帧号排序的帧数据列表
     
-    for line in debug_output.split('\n'):
-        line = line.strip()
-        if not line.startswith('{"type":'):
-            continue
-            
-        try:
-            data = json.loads(line)
-            frame_num = data.get('frame')
-            if not frame_num:
-                continue
-                
-            # 初始化帧数据结构
-            if frame_num not in frames:
-                frames[frame_num] = {
-                    'frame_number': frame_num,
-                    'mdct_coefficients': {
-                        'coefficients_before_aliasing': [0, 0, 0],  # k=17, k=16, k=15 (before aliasing)
-                        'coefficients_after_aliasing': [0, 0, 0],   # k=17, k=16, k=15 (after aliasing)
-                        'l3_sb_sample': [0]
-                    },
-                    'quantization': {
-                        'xrmax': 0,
-                        'max_bits': 0,
-                        'part2_3_length': 0,
-                        'quantizer_step_size': 0,
-                        'global_gain': 0
-                    },
-                    'bitstream': {
-                        'padding': 0,
-                        'bits_per_frame': 0,
-                        'written': 0,
-                        'slot_lag': 0.0
-                    }
-                }
-            
-            current_frame = frames[frame_num]
-            
-            # 解析不同类型的JSON数据
-            if data['type'] == 'mdct_coeff':
-                k = data.get('k')
-                value = data.get('value')
-                # 这些是混叠减少前的系数
-                if k == 17:
-                    current_frame['mdct_coefficients']['coefficients_before_aliasing'][0] = value
-                elif k == 16:
-                    current_frame['mdct_coefficients']['coefficients_before_aliasing'][1] = value
-                elif k == 15:
-                    current_frame['mdct_coefficients']['coefficients_before_aliasing'][2] = value
-            
-            elif data['type'] == 'mdct_coeff_after_aliasing':
-                k = data.get('k')
-                value = data.get('value')
-                # 这些是混叠减少后的系数
-                if k == 17:
-                    current_frame['mdct_coefficients']['coefficients_after_aliasing'][0] = value
-                elif k == 16:
-                    current_frame['mdct_coefficients']['coefficients_after_aliasing'][1] = value
-                elif k == 15:
-                    current_frame['mdct_coefficients']['coefficients_after_aliasing'][2] = value
-            
-            elif data['type'] == 'l3_sb_sample':
-                samples = data.get('samples', [])
-                if samples:
-                    current_frame['mdct_coefficients']['l3_sb_sample'] = [samples[0]]
-            
-            elif data['type'] == 'quantization_xrmax':
-                # 只取第一个通道第一个颗粒的数据作为代表
-                if data.get('ch') == 0 and data.get('gr') == 0:
-                    current_frame['quantization']['xrmax'] = data.get('xrmax', 0)
-            
-            elif data['type'] == 'quantization_max_bits':
-                if data.get('ch') == 0 and data.get('gr') == 0:
-                    current_frame['quantization']['max_bits'] = data.get('max_bits', 0)
-            
-            elif data['type'] == 'quantization_part2_3_length':
-                if data.get('ch') == 0 and data.get('gr') == 0:
-                    current_frame['quantization']['part2_3_length'] = data.get('part2_3_length', 0)
-            
-            elif data['type'] == 'quantization_part2_3_length_final':
-                # Use the final part2_3_length after reservoir adjustment
-                if data.get('ch') == 0 and data.get('gr') == 0:
-                    current_frame['quantization']['part2_3_length'] = data.get('part2_3_length', 0)
-            
-            elif data['type'] == 'quantization_global_gain':
-                if data.get('ch') == 0 and data.get('gr') == 0:
-                    current_frame['quantization']['quantizer_step_size'] = data.get('quantizer_step_size', 0)
-                    current_frame['quantization']['global_gain'] = data.get('global_gain', 0)
-            
-            elif data['type'] == 'bitstream_params':
-                current_frame['bitstream']['padding'] = data.get('padding', 0)
-                current_frame['bitstream']['bits_per_frame'] = data.get('bits_per_frame', 0)
-                current_frame['bitstream']['slot_lag'] = data.get('slot_lag', 0.0)
-            
-            elif data['type'] == 'frame_complete':
-                current_frame['bitstream']['written'] = data.get('written', 0)
-                
-        except json.JSONDecodeError:
-            continue
+    Shine按帧号递增的顺序输出，frames 的插入顺序通常已经有序，此时直接取出记录而不再排序；
+    只有帧号乱序出现时才按帧号排序。
+    """
+    records = list(frames.values())
+    if all(map(lt, frames, islice(frames, 1, None))):
+        return records
+    records.sort(key=attrgetter('frame_number'))
+    return records
+
+# MDCT系数 k -> 系数列表中的下标（k=17, 16, 15 依次存放在下标 0, 1, 2）
+_K_INDEX = {17: 0, 16: 1, 15: 2}
+
+def _json_mdct_setter(field_name):
+    """生成把 mdct_coeff 类记录（k=17, 16, 15）写入指定系数列表的处理函数"""
+    index_of = _K_INDEX.get
+    def handler(data, frame):
+        idx = index_of(data.get('k'))
+        if idx is not None:
+            getattr(frame.mdct_coefficients, field_name)[idx] = data.get('value')
+    return handler
+
+def _json_sb_sample(data, frame):
+    samples = data.get('samples', [])
+    if samples:
+        frame.mdct_coefficients.l3_sb_sample = [samples[0]]
+
+def _json_quantization_setter(*names):
+    """生成把同名字段写入 quantization 的处理函数（只取第一个通道第一个颗粒的数据作为代表）"""
+    def handler(data, frame):
+        if data.get('ch') == 0 and data.get('gr') == 0:
+            for name in names:
+                setattr(frame.quantization, name, data.get(name, 0))
+    return handler
+
+def _json_bitstream_params(data, frame):
+    frame.bitstream.padding = data.get('padding', 0)
+    frame.bitstream.bits_per_frame = data.get('bits_per_frame', 0)
+    frame.bitstream.slot_lag = data.get('slot_lag', 0.0)
+
+def _json_frame_complete(data, frame):
+    frame.bitstream.written = data.get('written', 0)
+
+# 记录类型 -> 处理函数，一次字典查找代替逐个比较类型字符串
+_JSON_DEBUG_HANDLERS = {
+    'mdct_coeff': _json_mdct_setter('coefficients_before_aliasing'),  # 混叠减少前的系数
+    'mdct_coeff_after_aliasing': _json_mdct_setter('coefficients_after_aliasing'),  # 混叠减少后的系数
+    'l3_sb_sample': _json_sb_sample,
+    'quantization_xrmax': _json_quantization_setter('xrmax'),
+    'quantization_max_bits': _json_quantization_setter('max_bits'),
+    'quantization_part2_3_length': _json_quantization_setter('part2_3_length'),
+    # Use the final part2_3_length after reservoir adjustment
+    'quantization_part2_3_length_final': _json_quantization_setter('part2_3_length'),
+    'quantization_global_gain': _json_quantization_setter('quantizer_step_size', 'global_gain'),
+    'bitstream_params': _json_bitstream_params,
+    'frame_complete': _json_frame_complete,
+}
+
+def _apply_json_debug_data(frames, data):
+    """把一条已解码的JSON调试记录写入frames"""
+    frame_num = data.get('frame')
+    if not frame_num:
+        return
+        
+    # 取出帧记录，首次出现时初始化（已有帧只需一次字典查找）
+    current_frame = frames.get(frame_num)
+    if current_frame is None:
+        current_frame = frames[frame_num] = _new_json_frame(frame_num)
     
-    # 转换为排序列表
-    frame_list = []
-    for frame_num in sorted(frames.keys()):
-        frame_list.append(frames[frame_num])
+    # 按记录类型分派到对应的处理函数
+    handler = _JSON_DEBUG_HANDLERS.get(data['type'])
+    if handler:
+        handler(data, current_frame)
+
+def _apply_json_debug_records(frames, records):
+    """
+    把一批JSON调试记录（JSON调试行的字节串）按顺序写入frames
+    
+    整批拼成一个JSON数组，用一次解码调用（orjson 可用时用 orjson）解码，避免每行一次调用解码器；
+    其中有无法解析的记录时逐条用标准库解码，跳过无效的记录。
+    """
+    try:
+        items = _json_loads(b'[' + b','.join(records) + b']')
+    except ValueError:  # JSONDecodeError，记录中含有非UTF-8字节，或 orjson 不支持的数值
+        items = None
+    if items is None or len(items) != len(records):
+        items = []
+        for record in records:
+            try:
+                items.append(json.loads(record.decode('utf-8', errors='replace')))
+            except json.JSONDecodeError:
+                pass
+    apply_data = _apply_json_debug_data
+    for data in items:
+        apply_data(frames, data)
+
+def _apply_json_debug_matches(frames, matches):
+    """
+    把 _JSON_DEBUG_LINE_RE.findall 的结果（(记录, 帧号) 元组）写入frames
     
-    return frame_list
+    需要处理的记录批量解码；其他类型的记录不解码，只用正则取出的帧号确保该帧存在，
+    与逐条解码所有记录时相同（任何类型的记录都会创建其所在的帧）。
+    """
+    records = [record for record, _ in matches if record]
+    if records:
+        _apply_json_debug_records(frames, records)
+    for record, frame_num in matches:
+        if not record:
+            frame_num = int(frame_num)
+            if frame_num and frame_num not in frames:
+                frames[frame_num] = _new_json_frame(frame_num)
 
-def parse_text_debug_output(debug_output):
-    """解析文本调试输出（备用方案）"""
+def parse_json_debug_output(blocks):
+    """解析Shine的JSON调试输出（可迭代的字节块，每块由完整的行组成，也可以是单行）"""
     frames = {}
+    for block in blocks:
+        matches = _JSON_DEBUG_LINE_RE.findall(block)
+        if matches:
+            _apply_json_debug_matches(frames, matches)
+    return _sorted_frame_list(frames)
+
+# 调试输出的融合正则，以 MULTILINE 模式直接在整块输出上 finditer，不逐行切分：
+# 第一个分支匹配JSON调试行（去掉行首空白后以 {"type": 开头），lastgroup 为 'json'；
+# 第二个分支匹配文本调试行：行内第一个帧号标记之后是各类数据行的选择分支。
+# 每个分支是一个命名分组，内部的值分组先闭合，因此 lastgroup 就是分支名，
+# 没有匹配到任何数据分支时 lastgroup 为 'frame'。两个分支都从行首开始，每行至多匹配一次
+_DEBUG_LINE_RE = re.compile(
+    rb'^[^\S\n]*(?P<json>\{"type":.*)'
+    rb'|^.*?\[SHINE DEBUG Frame (?P<frame>\d+)'
+    rb'(?:.*?(?:'
+    rb'(?P<mdct>MDCT coeff band 0 k (?P<mdct_k>1[5-7]): (?P<mdct_value>-?\d+))'
+    rb'|(?P<sb_sample>l3_sb_sample\[0\]\[1\]\[0\]: first 8 bands: \[(?P<sb_value>-?\d+))'
+    rb'|(?P<xrmax_line>ch=0, gr=0: xrmax=(?P<xrmax>-?\d+))'
+    rb'|(?P<max_bits_line>ch=0, gr=0: max_bits=(?P<max_bits>-?\d+))'
+    rb'|(?P<part2_3_length_line>ch=0, gr=0: part2_3_length=(?P<part2_3_length>-?\d+))'
+    rb'|(?P<step_gain>ch=0, gr=0: quantizerStepSize=(?P<quantizer_step_size>-?\d+), global_gain=(?P<global_gain>-?\d+))'
+    rb'|(?P<bitstream>padding=(?P<padding>-?\d+).*?bits_per_frame=(?P<bits_per_frame>-?\d+)'
+    rb'.*?slot_lag=(?P<slot_lag>-?\d+\.?\d*))'
+    rb'|(?P<written_line>written=(?P<written>-?\d+)(?=.*?bytes))'
+    rb'))?',
+    re.MULTILINE
+)
+
+# 只匹配JSON调试行：确定为JSON输出后不再需要文本分支，用 findall 直接取出 (记录, 帧号)；
+# 类型在 _JSON_DEBUG_HANDLERS 中的记录取出整行（第一个分组）用于解码，
+# 其他类型的记录不做JSON解码，只取出 "frame" 字段的值（第二个分组），用于创建该帧
+_JSON_DEBUG_LINE_RE = re.compile(
+    rb'^[^\S\n]*(?=\{"type":)'
+    rb'(?:(\{"type":[^\S\n]*"(?:'
+    + b'|'.join(re.escape(name.encode('ascii')) for name in _JSON_DEBUG_HANDLERS)
+    + rb')".*)'
+    rb'|.*?"frame":[^\S\n]*(\d+))',
+    re.MULTILINE
+)
+
+# 调试行标记，用于在正则扫描前用子串查找（C层 memchr 级别的速度）跳过不含调试行的块
+_JSON_DEBUG_MARKER = b'{"type":'
+_TEXT_DEBUG_MARKER = b'[SHINE DEBUG Frame'
+
+def _set_mdct(m, frame):
+    # k=17, 16, 15 依次存放在下标 0, 1, 2
+    frame.mdct_coefficients.coefficients[17 - int(m['mdct_k'])] = int(m['mdct_value'])
+
+def _set_sb_sample(m, frame):
+    frame.mdct_coefficients.l3_sb_sample = [int(m['sb_value'])]
+
+def _quantization_setter(*names):
+    """生成把同名捕获组写入 quantization 字段的处理函数"""
+    def handler(m, frame):
+        for name in names:
+            setattr(frame.quantization, name, int(m[name]))
+    return handler
+
+def _set_bitstream(m, frame):
+    # padding, bits_per_frame, slot_lag 由融合正则的同一分支一次提取
+    frame.bitstream.padding = int(m['padding'])
+    frame.bitstream.bits_per_frame = int(m['bits_per_frame'])
+    frame.bitstream.slot_lag = float(m['slot_lag'])
+
+def _set_written(m, frame):
+    # 只有 "written=N bytes" 行才匹配该分支（由正则中的前瞻保证）
+    frame.bitstream.written = int(m['written'])
+
+# 分支名 -> 处理函数，处理函数把匹配到的值写入当前帧
+_TEXT_DEBUG_HANDLERS = {
+    'mdct': _set_mdct,
+    'sb_sample': _set_sb_sample,
+    'xrmax_line': _quantization_setter('xrmax'),
+    'max_bits_line': _quantization_setter('max_bits'),
+    'part2_3_length_line': _quantization_setter('part2_3_length'),
+    'step_gain': _quantization_setter('quantizer_step_size', 'global_gain'),
+    'bitstream': _set_bitstream,
+    'written_line': _set_written,
+}
+
+def _text_debug_applier(frames):
+    """
+    返回把文本调试行的匹配结果写入frames的函数
+    
+    同一帧的调试行是连续输出的：帧号文本与上一行相同时直接复用上一次取到的帧记录，
+    只有帧号变化时才转换帧号、查找或初始化帧记录。
+    """
+    last_frame_text = None
     current_frame = None
+    # 每行都会用到的全局名和方法预先绑定为闭包变量，省去逐行的全局查找和属性查找
+    _int = int
+    get_frame = frames.get
+    get_handler = _TEXT_DEBUG_HANDLERS.get
+    
+    def apply(match):
+        nonlocal last_frame_text, current_frame
+        frame_text = match['frame']
+        if frame_text != last_frame_text:
+            frame_num = _int(frame_text)
+            current_frame = get_frame(frame_num)
+            if current_frame is None:
+                current_frame = frames[frame_num] = _new_text_frame(frame_num)
+            last_frame_text = frame_text
+        
+        # 按分支名分派到对应的处理函数
+        handler = get_handler(match.lastgroup)
+        if handler:
+            handler(match, current_frame)
+    
+    return apply
+
+def parse_text_debug_output(blocks):
+    """解析文本调试输出（备用方案，可迭代的字节块，每块由完整的行组成，也可以是单行）"""
+    frames = {}
+    apply_text = _text_debug_applier(frames)
+    finditer = _DEBUG_LINE_RE.finditer
+    for block in blocks:
+        for match in finditer(block):
+            if match.lastgroup != 'json':
+                apply_text(match)
+    return _sorted_frame_list(frames)
+
+def parse_shine_debug_output(blocks, out=None):
+    """
+    解析Shine调试输出（可迭代的字节块，每块由完整的行组成，也可以是单行），优先使用JSON格式
+    
+    只遍历一次输出，可以直接消费编码器的输出流：JSON行写入JSON结果；
+    在出现第一条JSON行之前，文本调试行同时解析为备用结果。
+    使用的解析方式写入 out（默认 sys.stdout）。
+    """
+    json_frames = {}
+    text_frames = {}
+    is_json_output = False
+    apply_text = _text_debug_applier(text_frames)
+    # 循环内用到的全局对象和方法绑定为局部变量（LOAD_FAST 代替 LOAD_GLOBAL 和属性查找）
+    finditer = _DEBUG_LINE_RE.finditer
+    findall_json = _JSON_DEBUG_LINE_RE.findall
+    apply_json = _apply_json_debug_matches
+    json_marker = _JSON_DEBUG_MARKER
+    text_marker = _TEXT_DEBUG_MARKER
     
-    for line in debug_output.split('\n'):
-        line = line.strip()
+    for block in blocks:
+        if is_json_output:
+            # 已确定为JSON输出：只提取JSON记录，跳过文本分支的逐行扫描
+            if json_marker in block:
+                apply_json(json_frames, findall_json(block))
+            continue
+        if json_marker not in block and text_marker not in block:
+            continue
         
-        # 解析帧特定的调试输出
-        if "[SHINE DEBUG Frame" in line:
-            # 提取帧号
-            frame_match = re.search(r'Frame (\d+)', line)
-            if frame_match:
-                frame_num = int(frame_match.group(1))
-                
-                # 初始化新帧
-                if frame_num not in frames:
-                    frames[frame_num] = {
-                        'frame_number': frame_num,
-                        'mdct_coefficients': {
-                            'coefficients': [0, 0, 0],
-                            'l3_sb_sample': [0]
-                        },
-                        'quantization': {
-                            'xrmax': 0,
-                            'max_bits': 0,
-                            'part2_3_length': 0,
-                            'quantizer_step_size': 0,
-                            'global_gain': 0
-                        },
-                        'bitstream': {
-                            'padding': 0,
-                            'bits_per_frame': 0,
-                            'written': 0,
-                            'slot_lag': 0.0
-                        }
-                    }
-                
-                current_frame = frames[frame_num]
-            
-            # 解析具体的调试值（现有的文本解析逻辑）
-            if "MDCT coeff band 0 k 17:" in line:
-                coeff_match = re.search(r'k 17: (-?\d+)', line)
-                if coeff_match:
-                    current_frame['mdct_coefficients']['coefficients'][0] = int(coeff_match.group(1))
-            
-            elif "MDCT coeff band 0 k 16:" in line:
-                coeff_match = re.search(r'k 16: (-?\d+)', line)
-                if coeff_match:
-                    current_frame['mdct_coefficients']['coefficients'][1] = int(coeff_match.group(1))
-            
-            elif "MDCT coeff band 0 k 15:" in line:
-                coeff_match = re.search(r'k 15: (-?\d+)', line)
-                if coeff_match:
-                    current_frame['mdct_coefficients']['coefficients'][2] = int(coeff_match.group(1))
-            
-            elif "l3_sb_sample[0][1][0]: first 8 bands:" in line:
-                sample_match = re.search(r'first 8 bands: \[(-?\d+)', line)
-                if sample_match:
-                    current_frame['mdct_coefficients']['l3_sb_sample'] = [
-                        int(sample_match.group(1))
-                    ]
-            
-            elif "ch=0, gr=0: xrmax=" in line:
-                xrmax_match = re.search(r'xrmax=(-?\d+)', line)
-                if xrmax_match:
-                    current_frame['quantization']['xrmax'] = int(xrmax_match.group(1))
-            
-            elif "ch=0, gr=0: max_bits=" in line:
-                bits_match = re.search(r'max_bits=(-?\d+)', line)
-                if bits_match:
-                    current_frame['quantization']['max_bits'] = int(bits_match.group(1))
-            
-            elif "ch=0, gr=0: part2_3_length=" in line:
-                length_match = re.search(r'part2_3_length=(-?\d+)', line)
-                if length_match:
-                    current_frame['quantization']['part2_3_length'] = int(length_match.group(1))
-            
-            elif "ch=0, gr=0: quantizerStepSize=" in line:
-                step_match = re.search(r'quantizerStepSize=(-?\d+), global_gain=(-?\d+)', line)
-                if step_match:
-                    current_frame['quantization']['quantizer_step_size'] = int(step_match.group(1))
-                    current_frame['quantization']['global_gain'] = int(step_match.group(2))
-            
-            elif "padding=" in line and "bits_per_frame=" in line and "slot_lag=" in line:
-                padding_match = re.search(r'padding=(-?\d+)', line)
-                bits_match = re.search(r'bits_per_frame=(-?\d+)', line)
-                lag_match = re.search(r'slot_lag=(-?\d+\.?\d*)', line)
-                
-                if padding_match:
-                    current_frame['bitstream']['padding'] = int(padding_match.group(1))
-                if bits_match:
-                    current_frame['bitstream']['bits_per_frame'] = int(bits_match.group(1))
-                if lag_match:
-                    current_frame['bitstream']['slot_lag'] = float(lag_match.group(1))
-            
-            elif "written=" in line and "bytes" in line:
-                written_match = re.search(r'written=(-?\d+)', line)
-                if written_match:
-                    current_frame['bitstream']['written'] = int(written_match.group(1))
-    
-    # 转换为排序列表
-    frame_list = []
-    for frame_num in sorted(frames.keys()):
-        frame_list.append(frames[frame_num])
-    
-    return frame_list
-
-def parse_shine_debug_output(debug_output):
-    """解析Shine调试输出，优先使用JSON格式"""
-    
-    # 检查输出是否包含JSON
-    is_json_output = any(line.strip().startswith('{"type":') for line in debug_output.split('\n'))
+        # 出现第一条JSON行（任意类型）即确定为JSON输出，本块中之后的文本行不再解析，
+        # 本块中的JSON记录随后由 findall 一次取出并批量处理
+        for match in finditer(block):
+            if match.lastgroup == 'json':
+                is_json_output = True
+                break
+            apply_text(match)
+        if is_json_output:
+            apply_json(json_frames, findall_json(block))
     
     if is_json_output:
-        print("  使用JSON调试输出解析")
-        return parse_json_debug_output(debug_output)
+        print("  使用JSON调试输出解析", file=out)
+        return _sorted_frame_list(json_frames)
     else:
-        print("  使用文本调试输出解析（备用）")
-        return parse_text_debug_output(debug_output)
+        print("  使用文本调试输出解析（备用）", file=out)
+        return _sorted_frame_list(text_frames)
 
-def generate_test_data_structure(config, wav_metadata, mp3_file, frames):
-    """生成测试数据结构"""
+def _orjson_indented(value, indent):
+    """用 orjson 序列化一个值（缩进为2），并把续行整体缩进 indent 个空格以嵌入外层结构"""
+    # JSON字符串中的换行总是被转义，因此输出中的换行都是结构换行
+    return orjson.dumps(value, option=orjson.OPT_INDENT_2).replace(b'\n', b'\n' + b' ' * indent)
+
+def _write_json_streaming(f, data):
+    """
+    用 orjson 逐项写出顶层字典，输出与 orjson.dumps(data, option=OPT_INDENT_2) 完全相同
+    
+    列表类型的值（帧数据）逐个元素序列化写入，不在内存中构造整个文档的序列化结果。
+    """
+    if not data:
+        f.write(b'{}')
+        return
+    
+    f.write(b'{')
+    for i, (key, value) in enumerate(data.items()):
+        f.write(b',\n  ' if i else b'\n  ')
+        f.write(orjson.dumps(key) + b': ')
+        if isinstance(value, list) and value:
+            f.write(b'[')
+            for j, item in enumerate(value):
+                f.write(b',\n    ' if j else b'\n    ')
+                f.write(_orjson_indented(item, 4))
+            f.write(b'\n  ]')
+        else:
+            f.write(_orjson_indented(value, 2))
+    f.write(b'\n}')
+
+def write_json(json_file, data):
+    """写入缩进为2、保留非ASCII字符的JSON文件"""
+    if orjson is not None:
+        with open(json_file, 'wb') as f:
+            # orjson 原生序列化数据类；逐帧写入
+            _write_json_streaming(f, data)
+    else:
+        # json.dump 本身按 iterencode 的片段逐段写入文件
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False, default=_record_as_dict)
+
+def _stat_signature(st):
+    """文件的大小和修改时间"""
+    return [st.st_size, st.st_mtime_ns]
+
+def _input_signature(audio_stat):
+    """输入文件（音频、Shine编码器）的大小和修改时间，用作缓存的快速预检（音频文件的 stat 由调用方传入）"""
+    return {
+        "audio": _stat_signature(audio_stat),
+        "exe": _stat_signature(os.stat(SHINE_EXE)),
+    }
+
+def _output_signature(json_file):
+    """已生成测试数据文件的大小和修改时间，文件不存在时返回 None"""
+    try:
+        return _stat_signature(os.stat(json_file))
+    except FileNotFoundError:
+        return None
+
+def compute_cache_key(config, out=None):
+    """按内容计算缓存键：音频文件和Shine编码器的哈希值加上测试配置"""
+    key_source = {
+        "audio": calculate_sha256(config["audio_file"], out),
+        "exe": calculate_sha256(SHINE_EXE, out),
+        "cfg": config,
+    }
+    return hashlib.sha256(json.dumps(key_source, sort_keys=True).encode()).hexdigest()
+
+# 缓存状态（各配置的缓存键和文件 stat）保存在测试数据目录下不受版本控制的文件中，
+# 与本机相关的修改时间不写入测试数据本身
+CACHE_FILE_NAME = ".cache.json"
+
+def load_cache(cache_file):
+    """读取缓存状态，文件不存在或无法解析时返回空字典"""
+    try:
+        with open(cache_file, 'rb') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+def save_cache(cache_file, cache):
+    """写入缓存状态"""
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+
+def _utc_timestamp():
+    """当前UTC时间的ISO 8601字符串（以 Z 结尾）"""
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+def generate_test_data_structure(config, wav_metadata, mp3_file, frames, file_hash=None, file_size=None,
+                                 created_at=None, out=None):
+    """
+    生成测试数据结构
+    
+    file_hash、file_size 为编码时已得到的哈希值和文件大小，缺省时从磁盘获取；
+    created_at 为本次运行开始时记录的时间戳，缺省时取当前时间；
+    out 接收计算哈希值时的出错信息（默认 sys.stdout）。
+    """
     
-    # 计算文件大小和哈希值
-    file_size = os.path.getsize(mp3_file) if os.path.exists(mp3_file) else 0
-    file_hash = calculate_sha256(mp3_file) if os.path.exists(mp3_file) else ""
+    # 计算文件大小和哈希值（至多一次 stat，结果同时用于大小和哈希）
+    if file_size is None:
+        try:
+            file_size = os.stat(mp3_file).st_size
+        except FileNotFoundError:
+            file_size, file_hash = 0, ""
+    if file_hash is None:
+        file_hash = calculate_sha256(mp3_file, out)
     
     # 根据通道数确定立体声模式
-    stereo_mode = 3 if wav_metadata["channels"] == 1 else 0  # 3=单声道, 0=立体声
+    stereo_mode = 3 if wav_metadata.channels == 1 else 0  # 3=单声道, 0=立体声
     
     test_data = {
         "metadata": {
-            "name": f"test_case_{config['name']}_{wav_metadata['sample_rate']}hz_{wav_metadata['channels']}ch_{config['bitrate']}kbps",
+            "name": f"test_case_{config['name']}_{wav_metadata.sample_rate}hz_{wav_metadata.channels}ch_{config['bitrate']}kbps",
             "input_file": config["audio_file"],
             "expected_output_size": file_size,
             "expected_hash": file_hash,
-            "created_at": datetime.now().isoformat() + "Z",
+            "created_at": created_at or _utc_timestamp(),
             "description": config["description"],
             "generated_by": "Shine reference implementation with debug output"
         },
         "config": {
-            "sample_rate": wav_metadata["sample_rate"],
-            "channels": wav_metadata["channels"],
+            "sample_rate": wav_metadata.sample_rate,
+            "channels": wav_metadata.channels,
             "bitrate": config["bitrate"],
             "stereo_mode": stereo_mode,
             "mpeg_version": 3  # MPEG-I
@@ -391,8 +691,121 @@ def generate_test_data_structure(config, wav_metadata, mp3_file, frames):
     
     return test_data
 
+def process_config(config, force=False, created_at=None, cache=None, out=None):
+    """
+    处理单个测试配置：运行Shine、解析调试输出并写入测试数据，返回是否成功
+    
+    已有的测试数据由相同的音频文件、Shine编码器和配置生成时直接跳过（force=True 时总是重新生成）。
+    created_at 写入新生成数据的 metadata.created_at。
+    cache 为缓存状态字典（见 load_cache），本配置的条目在其中按配置名读取和更新。
+    处理过程的输出写入 out（默认 sys.stdout）。
+    """
+    if cache is None:
+        cache = {}
+    output_dir = Path("testing/fixtures/data")
+    json_file = output_dir / f"{config['name']}.json"
+    
+    print(f"处理: {config['name']}", file=out)
+    print(f"音频文件: {config['audio_file']}", file=out)
+    print(f"比特率: {config['bitrate']}kbps，帧数: {config['frames']}", file=out)
+    
+    # 检查音频文件是否存在（同一次 stat 的结果也用于缓存检查）
+    try:
+        audio_stat = os.stat(config["audio_file"])
+    except FileNotFoundError:
+        print(f"⚠ 跳过 {config['name']} - 找不到音频文件", file=out)
+        return False
+    
+    # 缓存检查：先比较文件大小和修改时间，不一致时再按内容哈希比较
+    cache_key = None
+    try:
+        input_signature = _input_signature(audio_stat)
+    except OSError:
+        input_signature = None  # 找不到编码器，由 run_shine_with_json_debug 报告
+    
+    entry = None if force or input_signature is None else cache.get(config["name"])
+    # 测试数据文件自上次生成后被删除或修改（例如切换了分支）时不使用缓存
+    if entry and entry.get("output") is not None and entry["output"] == _output_signature(json_file):
+        up_to_date = entry.get("stat") == input_signature
+        if not up_to_date and entry.get("key"):
+            cache_key = compute_cache_key(config, out)
+            up_to_date = entry["key"] == cache_key
+            if up_to_date:
+                # 内容未变、只有 stat 变了：记录新的 stat，之后的运行无需再计算哈希
+                cache[config["name"]] = {**entry, "stat": input_signature}
+        if up_to_date:
+            print(f"✓ 已是最新（缓存），跳过: {json_file}", file=out)
+            print(file=out)
+            return True
+    
+    # 读取WAV元数据（只在需要重新生成时读取：已是最新的配置不打开WAV文件）
+    wav_metadata = read_wav_metadata(config["audio_file"], out)
+    if not wav_metadata:
+        print(f"⚠ 跳过 {config['name']} - 无法读取WAV元数据", file=out)
+        return False
+    
+    print(f"WAV信息: {wav_metadata.channels}声道, {wav_metadata.sample_rate}Hz", file=out)
+    
+    # 使用Shine生成MP3并捕获调试输出
+    mp3_filename = f"{config['name']}.mp3"
+    # 调试数据在编码器运行时即被解析
+    frames, mp3_file, file_hash, file_size = run_shine_with_json_debug(
+        config["audio_file"], mp3_filename, config["bitrate"], config["frames"], out
+    )
+    
+    if frames is None or mp3_file is None:
+        print(f"✗ 为 {config['name']} 生成MP3失败", file=out)
+        return False
+    
+    if not frames:
+        print(f"✗ 为 {config['name']} 提取调试数据失败", file=out)
+        return False
+    
+    # 生成测试数据结构
+    test_data = generate_test_data_structure(config, wav_metadata, mp3_file, frames, file_hash, file_size,
+                                             created_at, out)
+    
+    # 保存测试数据
+    write_json(json_file, test_data)
+    if input_signature is not None:
+        cache[config["name"]] = {
+            "key": cache_key or compute_cache_key(config, out),
+            "stat": input_signature,
+            "output": _output_signature(json_file),
+        }
+    
+    print(f"✓ 生成测试数据: {json_file}", file=out)
+    print(f"  输出大小: {test_data['metadata']['expected_output_size']} 字节", file=out)
+    print(f"  SHA256: {test_data['metadata']['expected_hash'][:16]}...", file=out)
+    print(f"  提取帧数: {len(frames)}", file=out)
+    
+    # 打印样本数据用于验证
+    if frames:
+        frame1 = frames[0]
+        print(f"  第1帧样本数据:", file=out)
+        print(f"    MDCT系数(混叠前): {frame1.mdct_coefficients.coefficients_before_aliasing}", file=out)
+        print(f"    MDCT系数(混叠后): {frame1.mdct_coefficients.coefficients_after_aliasing}", file=out)
+        print(f"    l3_sb_sample: {frame1.mdct_coefficients.l3_sb_sample}", file=out)
+        print(f"    xrmax: {frame1.quantization.xrmax}", file=out)
+        print(f"    global_gain: {frame1.quantization.global_gain}", file=out)
+        print(f"    padding: {frame1.bitstream.padding}", file=out)
+        print(f"    written: {frame1.bitstream.written}", file=out)
+    
+    print(file=out)
+    return True
+
+def _process_config_logged(config, force=False, created_at=None, cache=None):
+    """在工作线程中运行 process_config，把其输出写入独立的缓冲区，返回 (是否成功, 输出文本) 供主线程按配置顺序打印"""
+    log = io.StringIO()
+    ok = process_config(config, force, created_at, cache, out=log)
+    return ok, log.getvalue()
+
 def main():
     """主函数，生成所有参考测试数据"""
+    parser = argparse.ArgumentParser(description="MP3编码器参考数据生成器")
+    parser.add_argument('--force', action='store_true',
+                        help='忽略缓存，重新生成所有参考数据')
+    args = parser.parse_args()
     
     print("MP3编码器参考数据生成器")
     print("=" * 50)
@@ -403,71 +816,26 @@ def main():
     output_dir = Path("testing/fixtures/data")
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    success_count = 0
+    cache_file = output_dir / CACHE_FILE_NAME
+    cache = load_cache(cache_file)
+    previous_cache = dict(cache)
     
-    for config in TEST_CONFIGS:
-        print(f"处理: {config['name']}")
-        print(f"音频文件: {config['audio_file']}")
-        print(f"比特率: {config['bitrate']}kbps，帧数: {config['frames']}")
-        
-        # 检查音频文件是否存在
-        if not os.path.exists(config["audio_file"]):
-            print(f"⚠ 跳过 {config['name']} - 找不到音频文件")
-            continue
-        
-        # 读取WAV元数据
-        wav_metadata = read_wav_metadata(config["audio_file"])
-        if not wav_metadata:
-            print(f"⚠ 跳过 {config['name']} - 无法读取WAV元数据")
-            continue
-        
-        print(f"WAV信息: {wav_metadata['channels']}声道, {wav_metadata['sample_rate']}Hz")
-        
-        # 使用Shine生成MP3并捕获调试输出
-        mp3_filename = f"{config['name']}.mp3"
-        debug_output, mp3_file = run_shine_with_json_debug(
-            config["audio_file"], mp3_filename, config["bitrate"], config["frames"]
-        )
-        
-        if debug_output is None or mp3_file is None:
-            print(f"✗ 为 {config['name']} 生成MP3失败")
-            continue
-        
-        # 解析调试数据
-        frames = parse_shine_debug_output(debug_output)
-        
-        if not frames:
-            print(f"✗ 为 {config['name']} 提取调试数据失败")
-            continue
-        
-        # 生成测试数据结构
-        test_data = generate_test_data_structure(config, wav_metadata, mp3_file, frames)
-        
-        # 保存测试数据
-        json_file = output_dir / f"{config['name']}.json"
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(test_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"✓ 生成测试数据: {json_file}")
-        print(f"  输出大小: {test_data['metadata']['expected_output_size']} 字节")
-        print(f"  SHA256: {test_data['metadata']['expected_hash'][:16]}...")
-        print(f"  提取帧数: {len(frames)}")
-        
-        # 打印样本数据用于验证
-        if frames:
-            frame1 = frames[0]
-            print(f"  第1帧样本数据:")
-            print(f"    MDCT系数(混叠前): {frame1['mdct_coefficients']['coefficients_before_aliasing']}")
-            print(f"    MDCT系数(混叠后): {frame1['mdct_coefficients']['coefficients_after_aliasing']}")
-            print(f"    l3_sb_sample: {frame1['mdct_coefficients']['l3_sb_sample']}")
-            print(f"    xrmax: {frame1['quantization']['xrmax']}")
-            print(f"    global_gain: {frame1['quantization']['global_gain']}")
-            print(f"    padding: {frame1['bitstream']['padding']}")
-            print(f"    written: {frame1['bitstream']['written']}")
-        
-        success_count += 1
-        print()
+    # 各配置相互独立（MP3文件名各不相同），主要耗时在Shine子进程中，用线程池并行处理即可；
+    # 每个配置的输出在工作线程中缓冲，按配置顺序一次写出并刷新（每个配置一次 write）；
+    # 每个配置只更新缓存中自己的条目
+    success_count = 0
+    with ThreadPoolExecutor(max_workers=len(TEST_CONFIGS)) as executor:
+        # 所有配置使用同一个生成时间（运行开始时记录一次）
+        process = partial(_process_config_logged, force=args.force, created_at=_utc_timestamp(),
+                          cache=cache)
+        for ok, log in executor.map(process, TEST_CONFIGS):
+            sys.stdout.write(log)
+            sys.stdout.flush()
+            success_count += ok
     
+    if cache != previous_cache:
+        save_cache(cache_file, cache)
+
     print("=" * 50)
     print(f"生成了 {success_count}/{len(TEST_CONFIGS)} 个参考数据文件")
     
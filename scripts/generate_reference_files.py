@@ -17,22 +17,68 @@ Requirements:
 
 import os
 import sys
+import io
 import subprocess
-import hashlib
 import json
+import re
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Set, TextIO, Tuple, Optional
 import shutil
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+import _hashing
+
+# Declaration of the SCFSI test's expected hash constant (the rest of its line)
+EXPECTED_SHINE_HASH_RE = re.compile(r'^[ \t]*(const EXPECTED_SHINE_HASH:[^\n]*)', re.MULTILINE)
+
+# Configs are immutable records; __slots__ is only available for dataclasses on 3.10+
+_config_record = (dataclass(frozen=True, slots=True) if sys.version_info >= (3, 10)
+                  else dataclass(frozen=True))
+
+@_config_record
+class RefConfig:
+    """One reference file to generate."""
+    name: str
+    description: str
+    frame_limit: Optional[int]
+    expected_size: int
+    input_file: str
+    output_file: str
+
+# Cache state (stat data and input hashes, all machine-local) is kept out of the
+# manifest, in an untracked file next to it
+CACHE_FILE_NAME = ".reference_cache.json"
+
+def _list_dir_names(directory: Path) -> Optional[Set[str]]:
+    """Return the case-normalized entry names of a directory, or None if it doesn't exist."""
+    try:
+        with os.scandir(directory) as entries:
+            return {os.path.normcase(entry.name) for entry in entries}
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
 class ReferenceFileGenerator:
     """Generates and validates reference files for MP3 encoder testing."""
     
-    def __init__(self, workspace_root: str = "."):
+    def __init__(self, workspace_root: str = ".", force: bool = False):
         self.workspace_root = Path(workspace_root).resolve()
+        self.force = force
+        # Cache state from earlier runs (see load_cache), keyed by config name
+        self.cache = {}
+        # stat of the Shine binary, taken once per run and shared by all configs
+        self.shine_stat = None
+        # Environment for the encoder, copied once instead of per invocation
+        self._base_env = os.environ.copy()
         self.shine_binary = self.workspace_root / "ref" / "shine" / "shineenc"
         self.audio_dir = self.workspace_root / "tests" / "audio"
-        self.reference_configs = {
+        raw_configs = {
             # Basic frame count tests
             "3frames": {
                 "description": "3-frame reference for quick testing",
@@ -118,6 +164,9 @@ class ReferenceFileGenerator:
                 "output_file": "shine_reference_2frames.mp3"
             }
         }
+        self.reference_configs: Dict[str, RefConfig] = {
+            name: RefConfig(name=name, **config) for name, config in raw_configs.items()
+        }
     
     def check_prerequisites(self) -> bool:
         """Check if all required files and tools are available."""
@@ -130,9 +179,12 @@ class ReferenceFileGenerator:
             self.shine_binary.parent / 'shineenc.exe'
         ]
         
+        # All candidates live in the same directory: list it once instead of
+        # probing each path
+        shine_dir_names = _list_dir_names(self.shine_binary.parent) or set()
         shine_found = None
         for candidate in shine_candidates:
-            if candidate.exists():
+            if os.path.normcase(candidate.name) in shine_dir_names:
                 shine_found = candidate
                 break
         
@@ -146,8 +198,9 @@ class ReferenceFileGenerator:
         self.shine_binary = shine_found
         print(f"✅ Shine encoder found: {self.shine_binary}")
         
-        # Check audio directory
-        if not self.audio_dir.exists():
+        # Check audio directory (one directory read also answers the input file checks)
+        audio_names = _list_dir_names(self.audio_dir)
+        if audio_names is None:
             print(f"❌ Audio directory not found: {self.audio_dir}")
             return False
         print(f"✅ Audio directory found: {self.audio_dir}")
@@ -155,8 +208,8 @@ class ReferenceFileGenerator:
         # Check input files
         missing_files = []
         for config in self.reference_configs.values():
-            input_path = self.audio_dir / config["input_file"]
-            if not input_path.exists():
+            input_path = self.audio_dir / config.input_file
+            if os.path.normcase(config.input_file) not in audio_names:
                 missing_files.append(str(input_path))
             else:
                 print(f"✅ Input file found: {input_path}")
@@ -169,79 +222,88 @@ class ReferenceFileGenerator:
         
         return True
     
+    def hash_and_size(self, file_path: Path) -> Tuple[int, str]:
+        """Return the size and SHA256 hash of a file, read through a single open."""
+        return _hashing.hash_and_size(file_path)
+    
     def calculate_sha256(self, file_path: Path) -> str:
-        """Calculate SHA256 hash of a file."""
-        sha256_hash = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(chunk)
-        return sha256_hash.hexdigest()
+        """Calculate SHA256 hash of a file (cached while the file is unchanged)."""
+        return _hashing.calculate_sha256(file_path)
     
-    def run_shine_encoder(self, input_file: Path, output_file: Path, 
-                         frame_limit: Optional[int] = None) -> Tuple[bool, str]:
-        """Run Shine encoder with specified parameters."""
+    def run_shine_encoder(self, input_file: Path, output_file: Path,
+                         frame_limit: Optional[int] = None,
+                         out: Optional[TextIO] = None) -> Tuple[bool, str]:
+        """Run Shine encoder with specified parameters, reporting progress to out (default: stdout)."""
         cmd = [str(self.shine_binary), str(input_file), str(output_file)]
         
-        print(f"🎵 Running Shine encoder...")
-        print(f"   Command: {' '.join(cmd)}")
-        print(f"   Frame limit: {frame_limit if frame_limit else 'unlimited'}")
+        print(f"🎵 Running Shine encoder...", file=out)
+        print(f"   Command: {' '.join(cmd)}", file=out)
+        print(f"   Frame limit: {frame_limit if frame_limit else 'unlimited'}", file=out)
         
-        # Set up environment variables
-        env = os.environ.copy()
+        # Set up environment variables: without a frame limit the encoder just
+        # inherits ours (env=None); otherwise overlay the limit on the base copy
+        env = None
         if frame_limit is not None:
-            env["SHINE_MAX_FRAMES"] = str(frame_limit)
+            env = {**self._base_env, "SHINE_MAX_FRAMES": str(frame_limit)}
         
         try:
-            # Change to Shine directory to ensure proper execution
+            # Change to Shine directory to ensure proper execution.
+            # Output is captured as bytes and only decoded when it is shown on failure
             result = subprocess.run(
                 cmd,
                 cwd=self.shine_binary.parent,
                 capture_output=True,
-                text=True,
                 timeout=30,
                 env=env
             )
             
             if result.returncode == 0:
-                print("✅ Shine encoder completed successfully")
-                return True, result.stdout
+                print("✅ Shine encoder completed successfully", file=out)
+                return True, ""
             else:
-                print(f"❌ Shine encoder failed with code {result.returncode}")
-                print(f"   stdout: {result.stdout}")
-                print(f"   stderr: {result.stderr}")
-                return False, result.stderr
+                stderr = result.stderr.decode("utf-8", errors="replace")
+                print(f"❌ Shine encoder failed with code {result.returncode}", file=out)
+                print(f"   stdout: {result.stdout.decode('utf-8', errors='replace')}", file=out)
+                print(f"   stderr: {stderr}", file=out)
+                return False, stderr
                 
         except subprocess.TimeoutExpired:
-            print("❌ Shine encoder timed out")
+            print("❌ Shine encoder timed out", file=out)
             return False, "Timeout expired"
         except Exception as e:
-            print(f"❌ Error running Shine encoder: {e}")
+            print(f"❌ Error running Shine encoder: {e}", file=out)
             return False, str(e)
     
-    def validate_output(self, output_file: Path, expected_size: int, 
-                       config_name: str = None) -> Dict:
-        """Validate the generated output file."""
-        if not output_file.exists():
+    def check_size(self, output_file: Path) -> Optional[int]:
+        """Return the size of a file, or None if it doesn't exist (no content is read)."""
+        try:
+            return output_file.stat().st_size
+        except FileNotFoundError:
+            return None
+    
+    def validate_output(self, output_file: Path, expected_size: int,
+                       config_name: str = None, out: Optional[TextIO] = None) -> Dict:
+        """Validate the generated output file, reporting size differences to out (default: stdout)."""
+        # Size and hash come from one open and one pass over the file
+        try:
+            actual_size, file_hash = self.hash_and_size(output_file)
+        except FileNotFoundError:
             return {
                 "valid": False,
                 "error": f"Output file not found: {output_file}"
             }
         
         # Check file size
-        actual_size = output_file.stat().st_size
         
         # For new configurations, we might not know the exact size
         # If expected_size is an estimate (ends with common frame sizes), 
         # we'll accept the actual size and suggest updating the config
         size_mismatch = actual_size != expected_size
         if size_mismatch and config_name:
-            print(f"   📏 Size difference detected for {config_name}:")
-            print(f"      Expected: {expected_size} bytes")
-            print(f"      Actual:   {actual_size} bytes")
-            print(f"      Consider updating the expected_size in the configuration")
-        
-        # Calculate hash
-        file_hash = self.calculate_sha256(output_file)
+            print(f"   📏 Size difference detected for {config_name}:", file=out)
+            print(f"      Expected: {expected_size} bytes", file=out)
+            print(f"      Actual:   {actual_size} bytes", file=out)
+            print(f"      Consider updating the expected_size in the configuration", file=out)
         
         return {
             "valid": True,  # Always valid if file exists
@@ -252,44 +314,128 @@ class ReferenceFileGenerator:
             "path": str(output_file)
         }
     
-    def generate_reference_file(self, config_name: str) -> Dict:
-        """Generate a single reference file."""
-        config = self.reference_configs[config_name]
-        print(f"\n📁 Generating reference file: {config_name}")
-        print(f"   Description: {config['description']}")
-        
-        input_path = self.audio_dir / config["input_file"]
-        output_path = self.audio_dir / config["output_file"]
-        
-        # Remove existing output file
-        if output_path.exists():
-            output_path.unlink()
-            print(f"   Removed existing file: {output_path}")
-        
-        # Run Shine encoder
-        success, message = self.run_shine_encoder(
-            input_path, 
-            output_path,
-            config.get("frame_limit")
-        )
-        
-        if not success:
-            return {
-                "config": config_name,
-                "success": False,
-                "error": message
+    def _input_signature(self, config: "RefConfig", input_path: Path) -> Dict:
+        """Describe everything a reference file's content depends on, using stat data only."""
+        input_stat = input_path.stat()
+        if self.shine_stat is None:
+            self.shine_stat = self.shine_binary.stat()
+        return {
+            "input_size": input_stat.st_size,
+            "input_mtime_ns": input_stat.st_mtime_ns,
+            "frame_limit": config.frame_limit,
+            "shine_size": self.shine_stat.st_size,
+            "shine_mtime_ns": self.shine_stat.st_mtime_ns
+        }
+    
+    def _cached_entry(self, config_name: str, signature: Dict, input_path: Path) -> Optional[Dict]:
+        """Return the cache entry from an earlier run if it was generated from the same inputs."""
+        entry = self.cache.get(config_name)
+        if not entry or not entry.get("sha256"):
+            return None
+        if all(entry.get(key) == value for key, value in signature.items()):
+            return entry
+        # Only the input's mtime changed (e.g. after a fresh checkout): compare its content
+        rest = {key: value for key, value in signature.items() if key != "input_mtime_ns"}
+        if (all(entry.get(key) == value for key, value in rest.items())
+                and entry.get("input_sha256") == self.calculate_sha256(input_path)):
+            return entry
+        return None
+    
+    @property
+    def cache_path(self) -> Path:
+        """Untracked file holding the machine-local cache state (stat data, input hashes)."""
+        return self.audio_dir / CACHE_FILE_NAME
+    
+    def load_cache(self) -> None:
+        """Load the cache state of earlier runs so unchanged configs can be skipped."""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        self.cache = cache if isinstance(cache, dict) else {}
+    
+    def save_cache(self, results: List[Dict]) -> None:
+        """Record the inputs each successful result was generated from."""
+        cache = dict(self.cache)
+        for result in results:
+            cache[result["config"]] = {
+                "size_bytes": result["size"],
+                "sha256": result["sha256"],
+                **result["input_signature"],
+                "input_sha256": result["input_sha256"]
             }
-        
-        # Validate output
-        validation = self.validate_output(output_path, config["expected_size"], config_name)
+        if cache == self.cache:
+            return
+        try:
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, indent=2, sort_keys=True)
+            self.cache = cache
+        except OSError as e:
+            print(f"⚠️  Could not write cache file {self.cache_path}: {e}")
+    
+    def generate_reference_file(self, config_name: str, out: Optional[TextIO] = None) -> Dict:
+        """Generate a single reference file.
+        
+        If the cache shows the output was produced from the same input file,
+        frame limit and Shine binary, and the file on disk still has the
+        recorded hash, the Shine run is skipped. Progress is written
+        to out (default: stdout).
+        """
+        config = self.reference_configs[config_name]
+        print(f"\n📁 Generating reference file: {config_name}", file=out)
+        print(f"   Description: {config.description}", file=out)
+        
+        input_path = self.audio_dir / config.input_file
+        output_path = self.audio_dir / config.output_file
+        signature = self._input_signature(config, input_path)
+        
+        validation = None
+        cached = None if self.force else self._cached_entry(config_name, signature, input_path)
+        # A file whose size differs from the cached one is stale: regenerate it without hashing it first
+        if cached is not None and self.check_size(output_path) == cached.get("size_bytes"):
+            # No config_name: a stale file is regenerated, so don't report its size
+            validation = self.validate_output(output_path, config.expected_size, out=out)
+            if validation["valid"] and validation["sha256"] == cached["sha256"]:
+                print(f"   ⏭️  Up to date (inputs unchanged since last run), skipping Shine encoder", file=out)
+                input_sha256 = cached["input_sha256"]
+            else:
+                validation = None
+        
+        if validation is None:
+            # Remove existing output file (one unlink call instead of exists() + unlink())
+            try:
+                output_path.unlink()
+                print(f"   Removed existing file: {output_path}", file=out)
+            except FileNotFoundError:
+                pass
+            
+            # Run Shine encoder
+            success, message = self.run_shine_encoder(
+                input_path,
+                output_path,
+                config.frame_limit,
+                out
+            )
+            
+            if not success:
+                return {
+                    "config": config_name,
+                    "success": False,
+                    "error": message
+                }
+            
+            # Validate output
+            validation = self.validate_output(output_path, config.expected_size, config_name, out)
+            input_sha256 = self.calculate_sha256(input_path)
         
         if validation["valid"]:
-            print(f"✅ Reference file generated successfully")
-            print(f"   File: {output_path}")
-            print(f"   Size: {validation['size']} bytes")
+            print(f"✅ Reference file generated successfully", file=out)
+            print(f"   File: {output_path}", file=out)
+            print(f"   Size: {validation['size']} bytes", file=out)
             if not validation.get("size_matches", True):
-                print(f"   ⚠️  Size differs from expected ({validation['expected_size']} bytes)")
-            print(f"   SHA256: {validation['sha256']}")
+                print(f"   ⚠️  Size differs from expected ({validation['expected_size']} bytes)", file=out)
+            print(f"   SHA256: {validation['sha256']}", file=out)
             
             return {
                 "config": config_name,
@@ -299,26 +445,33 @@ class ReferenceFileGenerator:
                 "expected_size": validation["expected_size"],
                 "size_matches": validation.get("size_matches", True),
                 "sha256": validation["sha256"],
-                "description": config["description"]
+                "description": config.description,
+                "input_signature": signature,
+                "input_sha256": input_sha256
             }
         else:
-            print(f"❌ Validation failed: {validation['error']}")
+            print(f"❌ Validation failed: {validation['error']}", file=out)
             return {
                 "config": config_name,
                 "success": False,
                 "error": validation["error"]
             }
     
+    def _generate_reference_file_logged(self, config_name: str) -> Tuple[Dict, str]:
+        """Generate a reference file in a worker thread, returning its result and its output."""
+        log = io.StringIO()
+        result = self.generate_reference_file(config_name, out=log)
+        return result, log.getvalue()
+    
     def update_test_constants(self, results: List[Dict]) -> bool:
         """Update test constants with new hash values."""
         print("\n🔧 Updating test constants...")
         
         # Find the 6-frame result for SCFSI tests
-        scfsi_result = None
-        for result in results:
-            if result["config"] == "6frames" and result["success"]:
-                scfsi_result = result
-                break
+        scfsi_result = next(
+            (result for result in results if result["config"] == "6frames" and result["success"]),
+            None
+        )
         
         if not scfsi_result:
             print("❌ No successful 6-frame result found for SCFSI tests")
@@ -334,20 +487,16 @@ class ReferenceFileGenerator:
             # Read current content
             content = scfsi_test_file.read_text(encoding='utf-8')
             
-            # Update hash constant
-            old_hash_line = None
+            # Update hash constant (first declaration only; indentation is kept)
             new_hash_line = f'const EXPECTED_SHINE_HASH: &str = "{scfsi_result["sha256"]}";'
+            match = EXPECTED_SHINE_HASH_RE.search(content)
             
-            lines = content.split('\n')
-            for i, line in enumerate(lines):
-                if line.strip().startswith('const EXPECTED_SHINE_HASH:'):
-                    old_hash_line = line.strip()
-                    lines[i] = new_hash_line
-                    break
-            
-            if old_hash_line:
+            if match:
+                old_hash_line = match.group(1).strip()
                 # Write updated content
-                scfsi_test_file.write_text('\n'.join(lines), encoding='utf-8')
+                new_content = (content[:match.start(1)] + new_hash_line
+                               + content[match.end(1):])
+                scfsi_test_file.write_text(new_content, encoding='utf-8')
                 print(f"✅ Updated SCFSI test constants")
                 print(f"   Old: {old_hash_line}")
                 print(f"   New: {new_hash_line}")
@@ -385,8 +534,12 @@ class ReferenceFileGenerator:
                 }
         
         try:
-            with open(manifest_path, 'w', encoding='utf-8') as f:
-                json.dump(manifest, f, indent=2, ensure_ascii=False)
+            if orjson is not None:
+                # Same layout as the json.dump call below, serialized in C in one call
+                manifest_path.write_bytes(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+            else:
+                with open(manifest_path, 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f, indent=2, ensure_ascii=False)
             print(f"✅ Generated manifest: {manifest_path}")
             return True
         except Exception as e:
@@ -402,6 +555,8 @@ class ReferenceFileGenerator:
         # Check prerequisites
         if not self.check_prerequisites():
             return False
+        self.shine_stat = self.shine_binary.stat()
+        self.load_cache()
         
         # Determine which configs to generate
         if configs is None:
@@ -414,15 +569,23 @@ class ReferenceFileGenerator:
             print(f"   Available configs: {list(self.reference_configs.keys())}")
             return False
         
-        # Generate reference files
+        # Generate reference files. Each config runs its own Shine process and
+        # writes a distinct output file, so they run in parallel threads; each
+        # config's output is buffered and printed in config order.
         results = []
-        for config_name in configs:
-            result = self.generate_reference_file(config_name)
-            results.append(result)
-        
-        # Summary
-        successful = [r for r in results if r["success"]]
-        failed = [r for r in results if not r["success"]]
+        max_workers = max(1, min(len(configs), os.cpu_count() or 1))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for result, log in executor.map(self._generate_reference_file_logged, configs):
+                sys.stdout.write(log)
+                sys.stdout.flush()
+                results.append(result)
+        
+        # Summary (one pass splits the results)
+        successful = []
+        failed = []
+        for result in results:
+            (successful if result["success"] else failed).append(result)
+        self.save_cache(successful)
         
         print(f"\n📊 Generation Summary:")
         print(f"   ✅ Successful: {len(successful)}")
@@ -439,13 +602,14 @@ class ReferenceFileGenerator:
                 print(f"   - {result['config']}: {result['file_path']}")
                 print(f"     Size: {result['size']} bytes, SHA256: {result['sha256'][:16]}...")
         
-        # Update test constants if requested
+        # Update test constants if requested, then write the manifest; both
+        # only need the successful results
         if update_tests and successful:
-            self.update_test_constants(results)
+            self.update_test_constants(successful)
         
         # Generate manifest
         if successful:
-            self.generate_manifest(results)
+            self.generate_manifest(successful)
         
         return len(failed) == 0
 
@@ -463,6 +627,11 @@ def main():
         action="store_true",
         help="Don't update test constants automatically"
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate all files even if the cache shows they are up to date"
+    )
     parser.add_argument(
         "--workspace", 
         default=".",
@@ -471,7 +640,7 @@ def main():
     
     args = parser.parse_args()
     
-    generator = ReferenceFileGenerator(args.workspace)
+    generator = ReferenceFileGenerator(args.workspace, force=args.force)
     success = generator.run(
         configs=args.configs,
         update_tests=not args.no_update_tests
@@ -10,34 +10,97 @@ This script:
 
 import os
 import json
-import hashlib
 import subprocess
 import time
+from collections import deque
+from functools import lru_cache
 from pathlib import Path
 
-def calculate_sha256(file_path):
-    """Calculate SHA256 hash of a file."""
-    sha256_hash = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(chunk)
-    return sha256_hash.hexdigest()
+from _hashing import calculate_sha256, hash_and_size
 
-def run_shine_encoder(input_file, output_file):
-    """Run Rust encoder on input file (using Rust implementation as reference)."""
-    rust_exe = Path("target/debug/shine-rs-cli.exe")
-    if not rust_exe.exists():
-        rust_exe = Path("target/release/shine-rs-cli.exe")
-    if not rust_exe.exists():
-        raise FileNotFoundError(f"Rust encoder not found. Run 'cargo build' first.")
-    
-    cmd = ["cargo", "run", "--", str(input_file), str(output_file)]
-    result = subprocess.run(cmd, capture_output=True, text=True)
+# Debug CLI produced by `cargo build` (the profile `cargo run` used), with and without .exe
+RUST_EXE_CANDIDATES = (Path("target/debug/shine-rs-cli.exe"), Path("target/debug/shine-rs-cli"))
+
+@lru_cache(maxsize=1)
+def build_rust_encoder():
+    """Build the Rust encoder once with cargo and return the path of the fresh binary."""
+    try:
+        result = subprocess.run(["cargo", "build"], stdout=subprocess.DEVNULL)
+    except OSError as e:
+        raise RuntimeError(f"Failed to run cargo: {e}") from e
     
     if result.returncode != 0:
-        raise RuntimeError(f"Rust encoding failed: {result.stderr}")
+        raise RuntimeError(f"cargo build failed (exit code {result.returncode})")
+    
+    rust_exe = next((path for path in RUST_EXE_CANDIDATES if path.exists()), None)
+    if rust_exe is None:
+        raise FileNotFoundError("Rust encoder not found after 'cargo build'.")
+    return rust_exe
+
+def start_shine_encoder(input_file, output_file):
+    """Start the Rust encoder on input file without waiting for it to finish."""
+    # Invoke the built binary directly rather than through `cargo run`, which
+    # would re-check the whole crate graph for every file
+    rust_exe = build_rust_encoder()
+    
+    cmd = [str(rust_exe), str(input_file), str(output_file)]
+    # Output is kept as bytes; it is only decoded for the error message
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+def wait_shine_encoder(proc):
+    """Wait for an encoder started by start_shine_encoder; raise if it failed."""
+    stdout, stderr = proc.communicate()
     
-    return result
+    if proc.returncode != 0:
+        raise RuntimeError(f"Rust encoding failed: {stderr.decode('utf-8', errors='replace')}")
+    
+    return subprocess.CompletedProcess(proc.args, proc.returncode, stdout, stderr)
+
+def run_shine_encoder(input_file, output_file):
+    """Run Rust encoder on input file (using Rust implementation as reference)."""
+    return wait_shine_encoder(start_shine_encoder(input_file, output_file))
+
+def _collect_reference_file(wav_file, config_name, mp3_file, encoder, reference_files):
+    """Wait for one file's encoder and record its reference data."""
+    print(f"\nProcessing: {wav_file.name}")
+    
+    try:
+        # Run Rust encoder
+        print(f"  Encoding with Rust...")
+        if isinstance(encoder, Exception):
+            raise encoder
+        wait_shine_encoder(encoder)
+        
+        # Calculate file info (size and hash from a single pass)
+        try:
+            file_size, sha256_hash = hash_and_size(mp3_file)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Output file not created: {mp3_file}") from None
+        
+        print(f"  Size: {file_size} bytes")
+        print(f"  SHA256: {sha256_hash}")
+        
+        # Store reference data
+        reference_files[config_name] = {
+            "description": f"Reference MP3 for {wav_file.name}",
+            "input_file": f"basic/{wav_file.name}",
+            "file_path": f"reference/{mp3_file.name}",
+            "size_bytes": file_size,
+            "sha256": sha256_hash,
+            "encoding_parameters": {
+                "encoder": "Rust shine-rs",
+                "bitrate": 128,  # Default bitrate
+                "sample_rate": "auto",  # Determined from input file
+                "channels": "auto",  # Determined from input file
+                "stereo_mode": "stereo",  # Default stereo mode
+                "copyright": False,
+                "original": True,
+                "emphasis": "none"
+            }
+        }
+        
+    except Exception as e:
+        print(f"  ERROR: {e}")
 
 def generate_reference_data():
     """Generate all reference data."""
@@ -57,11 +120,19 @@ def generate_reference_data():
     
     print(f"Found {len(wav_files)} WAV files to process")
     
+    # Build once up front so every file is encoded by an up-to-date binary
+    # and a failed build stops the run before any encoder starts
+    print("Building Rust encoder (cargo build)...")
+    build_rust_encoder()
+    
     reference_files = {}
     
+    # Up to `window` encoders run at once; results are still collected and
+    # printed in file order, so the output matches a sequential run
+    window = os.cpu_count() or 1
+    pending = deque()
+    
     for wav_file in sorted(wav_files):
-        print(f"\nProcessing: {wav_file.name}")
-        
         # Generate config name from filename
         config_name = wav_file.stem
         if config_name.startswith("test_"):
@@ -70,43 +141,21 @@ def generate_reference_data():
         # Generate output filename
         mp3_file = reference_dir / f"{config_name}.mp3"
         
+        # "x.wav" and "test_x.wav" share an output file: finish the earlier one first
+        while any(entry[2] == mp3_file for entry in pending):
+            _collect_reference_file(*pending.popleft(), reference_files)
+        
         try:
-            # Run Rust encoder
-            print(f"  Encoding with Rust...")
-            result = run_shine_encoder(wav_file, mp3_file)
-            
-            if not mp3_file.exists():
-                raise FileNotFoundError(f"Output file not created: {mp3_file}")
-            
-            # Calculate file info
-            file_size = mp3_file.stat().st_size
-            sha256_hash = calculate_sha256(mp3_file)
-            
-            print(f"  Size: {file_size} bytes")
-            print(f"  SHA256: {sha256_hash}")
-            
-            # Store reference data
-            reference_files[config_name] = {
-                "description": f"Reference MP3 for {wav_file.name}",
-                "input_file": f"basic/{wav_file.name}",
-                "file_path": f"reference/{mp3_file.name}",
-                "size_bytes": file_size,
-                "sha256": sha256_hash,
-                "encoding_parameters": {
-                    "encoder": "Rust shine-rs",
-                    "bitrate": 128,  # Default bitrate
-                    "sample_rate": "auto",  # Determined from input file
-                    "channels": "auto",  # Determined from input file
-                    "stereo_mode": "stereo",  # Default stereo mode
-                    "copyright": False,
-                    "original": True,
-                    "emphasis": "none"
-                }
-            }
-            
+            encoder = start_shine_encoder(wav_file, mp3_file)
         except Exception as e:
-            print(f"  ERROR: {e}")
-            continue
+            encoder = e  # Reported when this file's turn comes
+        pending.append((wav_file, config_name, mp3_file, encoder))
+        
+        if len(pending) >= window:
+            _collect_reference_file(*pending.popleft(), reference_files)
+    
+    while pending:
+        _collect_reference_file(*pending.popleft(), reference_files)
     
     # Create manifest file
     manifest = {
@@ -5,10 +5,92 @@ Each MP3 frame contains 1152 samples, so we need 3456 samples total.
 """
 
 import wave
-import struct
 import math
+import sys
+from array import array
 
-def generate_test_wav(filename, sample_rate=44100, channels=2, duration_frames=3):
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to the pure-Python loop
+    np = None
+
+SAMPLES_PER_FRAME = 1152  # MP3 Layer III frame size
+
+def _generate_samples_numpy(total_samples, sample_rate, channels, amplitude):
+    """Vectorized sample synthesis, returns interleaved little-endian 16-bit PCM bytes."""
+    t = np.arange(total_samples, dtype=np.float64) / sample_rate
+    
+    if channels == 1:
+        samples = amplitude * np.sin(2 * np.pi * 440 * t)
+    else:
+        left = amplitude * 0.7 * np.sin(2 * np.pi * 440 * t)
+        right = amplitude * 0.7 * np.sin(2 * np.pi * 554.37 * t)
+        samples = np.stack([left, right], axis=1)
+    
+    # Truncate toward zero like int(); |sin| <= 1 keeps samples within 16-bit range
+    return np.trunc(samples).astype('<i2').tobytes()
+
+def _sine_oscillator(freq, sample_rate):
+    """
+    Yield sin(2*pi*freq*n/sample_rate) for n = 0, 1, 2, ...
+    
+    Uses the recurrence s[n+1] = 2*cos(w)*s[n] - s[n-1], so each sample
+    costs one multiply and one subtract instead of a math.sin() call.
+    """
+    w = 2 * math.pi * freq / sample_rate
+    k = 2 * math.cos(w)
+    s_prev, s_curr = 0.0, math.sin(w)
+    
+    while True:
+        yield s_prev
+        s_prev, s_curr = s_curr, k * s_curr - s_prev
+
+def _generate_samples_python(total_samples, sample_rate, channels, amplitude):
+    """Per-sample synthesis used when NumPy is not available."""
+    # Generate audio data into one contiguous 16-bit buffer
+    audio_data = array('h')
+    
+    if channels == 1:
+        # Mono: single sine wave at 440 Hz (A4 note)
+        osc = _sine_oscillator(440, sample_rate)
+        for _ in range(total_samples):
+            audio_data.append(int(amplitude * next(osc)))
+    else:
+        # Stereo: left channel 440 Hz (A4), right channel 554 Hz (C#5)
+        # Using musical intervals for more pleasant sound
+        left_osc = _sine_oscillator(440, sample_rate)
+        right_osc = _sine_oscillator(554.37, sample_rate)
+        for _ in range(total_samples):
+            # Interleaved L/R
+            audio_data.append(int(amplitude * 0.7 * next(left_osc)))
+            audio_data.append(int(amplitude * 0.7 * next(right_osc)))
+    
+    # WAV samples are little-endian
+    if sys.byteorder == 'big':
+        audio_data.byteswap()
+    return audio_data.tobytes()
+
+def build_samples(duration_frames, sample_rate=44100, channels=2):
+    """
+    Synthesize the test signal for the given number of MP3 frames.
+    
+    Returns interleaved little-endian 16-bit PCM bytes. The signal for a
+    shorter duration is a prefix of a longer one, so callers that need
+    several lengths can build the longest once and slice it.
+    """
+    total_samples = SAMPLES_PER_FRAME * duration_frames
+    
+    # Use higher amplitude for audible sound (about 50% of max 16-bit range)
+    amplitude = 16384  # Was too quiet, now using full range
+    # Samples are amplitude * sin(...), so they can't leave the 16-bit range
+    # and the synthesis paths don't clamp
+    assert amplitude <= 32767
+    
+    if np is not None:
+        return _generate_samples_numpy(total_samples, sample_rate, channels, amplitude)
+    return _generate_samples_python(total_samples, sample_rate, channels, amplitude)
+
+def generate_test_wav(filename, sample_rate=44100, channels=2, duration_frames=3, samples=None):
     """
     Generate a test WAV file with specified number of MP3 frames.
     
@@ -17,8 +99,11 @@ def generate_test_wav(filename, sample_rate=44100, channels=2, duration_frames=3
         sample_rate: Sample rate in Hz
         channels: Number of channels (1=mono, 2=stereo)
         duration_frames: Number of MP3 frames to generate
+        samples: Optional PCM bytes from build_samples() with the same sample
+            rate and channels, at least duration_frames long; only the
+            required prefix is written
     """
-    samples_per_frame = 1152  # MP3 Layer III frame size
+    samples_per_frame = SAMPLES_PER_FRAME
     total_samples = samples_per_frame * duration_frames
     
     print(f"Generating {filename}:")
@@ -29,41 +114,17 @@ def generate_test_wav(filename, sample_rate=44100, channels=2, duration_frames=3
     print(f"  Total samples: {total_samples}")
     print(f"  Duration: {total_samples / sample_rate:.3f} seconds")
     
+    if samples is None:
+        samples = build_samples(duration_frames, sample_rate, channels)
+    frame_data = memoryview(samples)[:total_samples * channels * 2]
+    
     with wave.open(filename, 'w') as wav_file:
         wav_file.setnchannels(channels)
         wav_file.setsampwidth(2)  # 16-bit
         wav_file.setframerate(sample_rate)
         
-        # Generate audio data - audible sine waves with proper amplitude
-        audio_data = []
-        
-        # Use higher amplitude for audible sound (about 50% of max 16-bit range)
-        amplitude = 16384  # Was too quiet, now using full range
-        
-        for i in range(total_samples):
-            # Time in seconds
-            t = i / sample_rate
-            
-            if channels == 1:
-                # Mono: single sine wave at 440 Hz (A4 note)
-                sample = int(amplitude * math.sin(2 * math.pi * 440 * t))
-                # Clamp to 16-bit range
-                sample = max(-32768, min(32767, sample))
-                audio_data.append(struct.pack('<h', sample))
-            else:
-                # Stereo: left channel 440 Hz (A4), right channel 554 Hz (C#5)
-                # Using musical intervals for more pleasant sound
-                left_sample = int(amplitude * 0.7 * math.sin(2 * math.pi * 440 * t))
-                right_sample = int(amplitude * 0.7 * math.sin(2 * math.pi * 554.37 * t))
-                
-                # Clamp to 16-bit range
-                left_sample = max(-32768, min(32767, left_sample))
-                right_sample = max(-32768, min(32767, right_sample))
-                
-                audio_data.append(struct.pack('<hh', left_sample, right_sample))
-        
         # Write all audio data
-        wav_file.writeframes(b''.join(audio_data))
+        wav_file.writeframes(frame_data)
     
     print(f"Generated {filename} successfully!")
 
@@ -74,16 +135,20 @@ if __name__ == "__main__":
     print("Generating test WAV files for frame limit replacement...")
     print("=" * 60)
     
+    # Synthesize the longest signal once; shorter files reuse its prefix
+    stereo_samples = build_samples(max(frame_counts), channels=2)
+    mono_samples = build_samples(max(frame_counts), channels=1)
+    
     for frames in frame_counts:
         # Generate stereo versions
         generate_test_wav(f"tests/audio/test_{frames}frames_stereo.wav", 
-                         channels=2, duration_frames=frames)
+                         channels=2, duration_frames=frames, samples=stereo_samples)
         
         # Generate mono versions  
         generate_test_wav(f"tests/audio/test_{frames}frames_mono.wav", 
-                         channels=1, duration_frames=frames)
+                         channels=1, duration_frames=frames, samples=mono_samples)
         
         print()  # Add spacing between different frame counts
     
     print("All test WAV files generated successfully!")
-    print("These files can be used to replace frame limit functionality in tests.")
\ No newline at end of file
+    print("These files can be used to replace frame limit functionality in tests.")
@@ -5,21 +5,35 @@
 简化版本，用于快速对比Rust和Shine编码器的输出结果。
 
 用法:
-    python scripts/quick_compare.py input.wav
+    python scripts/quick_compare.py input.wav [--serial]
+
+两个编码器默认同时运行；--serial 依次运行，用于对比编码耗时（同时运行时两者争用CPU）。
 """
 
+import filecmp
 import os
 import sys
 import subprocess
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+def run_timed(cmd):
+    """运行编码器命令，返回 (运行结果, 耗时秒数)"""
+    start_time = time.perf_counter()
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    return result, time.perf_counter() - start_time
+
 def main():
-    if len(sys.argv) != 2:
-        print("用法: python scripts/quick_compare.py input.wav")
+    args = sys.argv[1:]
+    serial = "--serial" in args
+    if serial:
+        args.remove("--serial")
+    if len(args) != 1:
+        print("用法: python scripts/quick_compare.py input.wav [--serial]")
         sys.exit(1)
     
-    input_file = sys.argv[1]
+    input_file = args[0]
     
     if not os.path.exists(input_file):
         print(f"错误: 输入文件 '{input_file}' 不存在")
@@ -62,47 +76,64 @@ def main():
     print(f"Shine输出: {shine_output}")
     print()
     
-    # 运行Rust编码器
-    print("运行Rust编码器...")
-    start_time = time.time()
-    rust_result = subprocess.run([rust_exe, input_file, str(rust_output)], 
-                                capture_output=True, text=True)
-    rust_time = time.time() - start_time
+    rust_cmd = [rust_exe, input_file, str(rust_output)]
+    shine_cmd = [shine_exe, input_file, str(shine_output)]
+    
+    if serial:
+        # 运行Rust编码器
+        print("运行Rust编码器...")
+        rust_result, rust_time = run_timed(rust_cmd)
+    else:
+        # 两个编码器读取同一个输入、写入不同的输出，同时运行；各自计时
+        print("同时运行Rust和Shine编码器...")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            rust_future = executor.submit(run_timed, rust_cmd)
+            shine_future = executor.submit(run_timed, shine_cmd)
+            rust_result, rust_time = rust_future.result()
+            shine_result, shine_time = shine_future.result()
     
     if rust_result.returncode == 0:
         print(f"✅ Rust编码成功 ({rust_time:.2f}秒)")
     else:
         print(f"❌ Rust编码失败: {rust_result.stderr}")
     
-    # 运行Shine编码器
-    print("运行Shine编码器...")
-    start_time = time.time()
-    shine_result = subprocess.run([shine_exe, input_file, str(shine_output)], 
-                                 capture_output=True, text=True)
-    shine_time = time.time() - start_time
+    if serial:
+        # 运行Shine编码器
+        print("运行Shine编码器...")
+        shine_result, shine_time = run_timed(shine_cmd)
     
     if shine_result.returncode == 0:
         print(f"✅ Shine编码成功 ({shine_time:.2f}秒)")
     else:
         print(f"❌ Shine编码失败: {shine_result.stderr}")
     
-    # 对比文件大小
-    if os.path.exists(rust_output) and os.path.exists(shine_output):
-        rust_size = os.path.getsize(rust_output)
-        shine_size = os.path.getsize(shine_output)
-        
+    # 对比文件大小（每个文件一次 stat，同时判断是否存在）
+    try:
+        rust_size = os.stat(rust_output).st_size
+        shine_size = os.stat(shine_output).st_size
+    except FileNotFoundError:
+        rust_size = shine_size = None
+    
+    if rust_size is not None:
         print(f"\n文件大小对比:")
         print(f"Rust:  {rust_size:,} 字节")
         print(f"Shine: {shine_size:,} 字节")
         
         if rust_size == shine_size:
             print("✅ 文件大小完全相同")
+            # 逐字节比较，遇到第一个不同的字节即停止
+            if filecmp.cmp(str(rust_output), str(shine_output), shallow=False):
+                print("✅ 字节级完全相同")
+            else:
+                print("❌ 文件内容不同")
         else:
             diff = abs(rust_size - shine_size)
             diff_percent = (diff / shine_size) * 100
             print(f"差异: {diff:,} 字节 ({diff_percent:.2f}%)")
     
     print(f"\n性能对比:")
+    if not serial:
+        print("（两个编码器同时运行，耗时互有影响；精确对比请使用 --serial）")
     if rust_result.returncode == 0 and shine_result.returncode == 0:
         if rust_time < shine_time:
             speedup = shine_time / rust_time
@@ -13,12 +13,24 @@ Usage:
 import os
 import sys
 import subprocess
-import hashlib
 import json
+import re
 import argparse
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 
+from _hashing import hash_and_size
+
+# Frame count embedded in config names such as "6frames" or "voice_1frame"
+_FRAME_RE = re.compile(r'(\d+)frames?')
+
+# Config-name substrings that select a non-default input file, checked in order
+_INPUT_MAP = (
+    ("voice", "voice-recorder-testing-1-2-3-sound-file.wav"),
+    ("large", "Free_Test_Data_500KB_WAV.wav"),
+)
+_DEFAULT_INPUT = "sample-3s.wav"
+
 class ReferenceFileValidator:
     """Validates Rust encoder output against Shine reference files."""
     
@@ -26,49 +38,55 @@ class ReferenceFileValidator:
         self.workspace_root = Path(workspace_root).resolve()
         self.audio_dir = self.workspace_root / "tests" / "audio"
         self.manifest_file = self.audio_dir / "inputs" / "reference_manifest.json"
+        self._manifest: Optional[Dict] = None
+        self._config_cache: Dict[str, Tuple[str, Optional[int]]] = {}
         
     def load_manifest(self) -> Dict:
-        """Load the reference file manifest."""
+        """Load the reference file manifest (parsed once per validator)."""
+        if self._manifest is not None:
+            return self._manifest
+        
         if not self.manifest_file.exists():
             raise FileNotFoundError(f"Manifest file not found: {self.manifest_file}")
         
         with open(self.manifest_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+            self._manifest = json.load(f)
+        
+        self._build_config_cache(self._manifest.get("reference_files", {}).keys())
+        return self._manifest
+    
+    def _parse_config_name(self, config_name: str) -> Tuple[str, Optional[int]]:
+        """Derive (input_file, frame_limit) from a config name."""
+        input_file = next(
+            (name for key, name in _INPUT_MAP if key in config_name),
+            _DEFAULT_INPUT
+        )
+        match = _FRAME_RE.search(config_name)
+        frame_limit = int(match.group(1)) if match else None
+        return input_file, frame_limit
+    
+    def _build_config_cache(self, config_names) -> None:
+        """Precompute the input file and frame limit of every known config."""
+        for config_name in config_names:
+            self._config_cache[config_name] = self._parse_config_name(config_name)
+    
+    def _config_info(self, config_name: str) -> Tuple[str, Optional[int]]:
+        info = self._config_cache.get(config_name)
+        if info is None:
+            info = self._config_cache[config_name] = self._parse_config_name(config_name)
+        return info
     
     def calculate_sha256(self, file_path: Path) -> str:
         """Calculate SHA256 hash of a file."""
-        sha256_hash = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(chunk)
-        return sha256_hash.hexdigest()
+        return hash_and_size(file_path)[1]
     
     def get_input_file_from_config(self, config_name: str) -> Optional[str]:
         """Extract input file name from config name and known patterns."""
-        if "voice" in config_name:
-            return "voice-recorder-testing-1-2-3-sound-file.wav"
-        elif "large" in config_name:
-            return "Free_Test_Data_500KB_WAV.wav"
-        else:
-            return "sample-3s.wav"
+        return self._config_info(config_name)[0]
     
     def get_frame_limit_from_config(self, config_name: str) -> Optional[int]:
         """Extract frame limit from config name."""
-        if "1frame" in config_name:
-            return 1
-        elif "2frames" in config_name:
-            return 2
-        elif "3frames" in config_name:
-            return 3
-        elif "6frames" in config_name:
-            return 6
-        elif "10frames" in config_name:
-            return 10
-        elif "15frames" in config_name:
-            return 15
-        elif "20frames" in config_name:
-            return 20
-        return None
+        return self._config_info(config_name)[1]
     
     def run_rust_encoder(self, input_file: str, output_file: str, 
                         frame_limit: Optional[int] = None) -> Tuple[bool, str]:
@@ -137,7 +155,9 @@ class ReferenceFileValidator:
         
         # Compare files
         rust_path = Path(rust_output)
-        if not rust_path.exists():
+        try:
+            rust_size = rust_path.stat().st_size
+        except FileNotFoundError:
             return {
                 "config": config_name,
                 "success": False,
@@ -145,7 +165,6 @@ class ReferenceFileValidator:
             }
         
         # Check file sizes
-        rust_size = rust_path.stat().st_size
         reference_size = reference_info['size_bytes']
         
         if rust_size != reference_size: